@@ -0,0 +1,231 @@
+"""
+Recorded and synthetic fixtures for benchmarks.
+
+Recorded fixtures directory layout:
+    iss/{boardgroup}.json - ISS securities response of boardgroup
+    smartlab/{ISIN}.html - smartLab bond page
+
+Usage: python benchmarks/fixtures.py DIRECTORY [--limit N] - records live fixtures.
+"""
+
+import os
+import sys
+import json
+import zlib
+import random
+import datetime
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+COLUMNS = [
+    "SECID",
+    "SHORTNAME",
+    "FACEVALUE",
+    "COUPONVALUE",
+    "COUPONPERIOD",
+    "MATDATE",
+    "PREVLEGALCLOSEPRICE",
+    "ACCRUEDINT",
+    "FACEUNIT",
+]
+SCORES = ["ruAAA", "ruAA+", "ruAA-", "ruA", "ruBBB+", "ruBB", "ruB-", None]
+LISTING_PAGE_SIZE = 500
+
+
+class Fixtures:
+    def __init__(self, directory: str | None = None):
+        """
+        Inits Fixtures.
+        If directory given - recorded fixtures are replayed, synthetic ones are generated otherwise.
+        """
+        self.directory = directory
+        self.securities = {}  # boardgroup -> list of rows
+        self.pages = {}  # ISIN -> page
+        self.recorded = []  # recorded rows of all boardgroups
+        if directory:
+            self._load(directory)
+
+    def scale(self, size: int, boardgroups: list[int], seed: int = 0) -> None:
+        """
+        Sets universe of `size` bonds split over boardgroups.
+        Recorded securities are repeated with new SECIDs until size is reached.
+        """
+        rng = random.Random(seed)
+        templates = self.recorded
+        self.securities = {boardgroup: [] for boardgroup in boardgroups}
+        for i in range(size):
+            if templates:
+                row = list(templates[i % len(templates)])
+                if i >= len(templates):
+                    row[0] = f"RU{i:010d}"
+            else:
+                row = self._synthetic_row(i, rng)
+            self.securities[boardgroups[i % len(boardgroups)]].append(row)
+
+    def securities_json(self, boardgroup: int) -> bytes:
+        rows = self.securities.get(boardgroup, [])
+        return json.dumps(
+            {"securities": {"columns": COLUMNS, "data": rows}}, ensure_ascii=False
+        ).encode("utf-8")
+
+    def bondization_json(self, SECID: str) -> bytes:
+        """
+        Returns synthetic ISS bondization response of security.
+        """
+        row = next(
+            (row for rows in self.securities.values() for row in rows if row[0] == SECID),
+            None,
+        )
+        coupons, amortizations = self._synthetic_schedule(row) if row else ([], [])
+        return json.dumps(
+            {
+                "coupons": {"columns": ["coupondate", "value"], "data": coupons},
+                "amortizations": {"columns": ["amortdate", "value"], "data": amortizations},
+            }
+        ).encode("utf-8")
+
+    def bulk_bondization_json(self, blocks: list[str], start: int, limit: int) -> bytes:
+        """
+        Returns page of synthetic ISS bondization statistics of all bonds.
+        """
+        rows = {"coupons": [], "amortizations": []}
+        for security in (row for rows in self.securities.values() for row in rows):
+            coupons, amortizations = self._synthetic_schedule(security)
+            rows["coupons"].extend([security[0], *flow] for flow in coupons)
+            rows["amortizations"].extend([security[0], *flow] for flow in amortizations)
+        columns = {
+            "coupons": ["secid", "coupondate", "value"],
+            "amortizations": ["secid", "amortdate", "value"],
+        }
+        return json.dumps(
+            {
+                block: {"columns": columns[block], "data": rows[block][start : start + limit]}
+                for block in blocks
+            }
+        ).encode("utf-8")
+
+    def page(self, ISIN: str) -> bytes:
+        if ISIN in self.pages:
+            return self.pages[ISIN]
+        return self._synthetic_page(self._score(ISIN)).encode("utf-8")
+
+    def listing(self, page: int) -> bytes:
+        """
+        Returns synthetic smartLab bonds listing page, pages are numbered from 1.
+        """
+        ISINs = [row[0] for rows in self.securities.values() for row in rows]
+        start = (page - 1) * LISTING_PAGE_SIZE
+        rows = "".join(
+            f"<tr><td><a href='/q/bonds/{ISIN}/'>{ISIN}</a></td>"
+            f"<td>{self._score(ISIN) or ''}</td></tr>"
+            for ISIN in ISINs[start : start + LISTING_PAGE_SIZE]
+        )
+        return (
+            "<html><head><meta charset='utf-8'></head><body><table>"
+            f"<tr><th>Облигация</th><th>Рейтинг</th></tr>{rows}</table></body></html>"
+        ).encode("utf-8")
+
+    def _score(self, ISIN: str) -> str | None:
+        return SCORES[zlib.crc32(ISIN.encode()) % len(SCORES)]
+
+    def _load(self, directory: str) -> None:
+        iss = os.path.join(directory, "iss")
+        for file_name in os.listdir(iss):
+            with open(os.path.join(iss, file_name), encoding="utf-8") as f:
+                data = json.load(f)
+            boardgroup = int(os.path.splitext(file_name)[0])
+            self.securities[boardgroup] = data["securities"]["data"]
+            self.recorded.extend(data["securities"]["data"])
+
+        smartlab = os.path.join(directory, "smartlab")
+        for file_name in os.listdir(smartlab):
+            with open(os.path.join(smartlab, file_name), "rb") as f:
+                self.pages[os.path.splitext(file_name)[0]] = f.read()
+
+    @staticmethod
+    def _synthetic_row(i: int, rng: random.Random) -> list:
+        maturity = datetime.date.today() + datetime.timedelta(days=rng.randint(-30, 5000))
+        return [
+            f"RU000A{i:06d}",
+            f"Облигация {i}",
+            rng.choice([1000, 1000, 1000, 500, 0]),
+            rng.choice([0, 12.5, 24.93, 35.9, 41.14]),
+            rng.choice([0, 30, 91, 182, 182]),
+            maturity.isoformat() if rng.random() > 0.01 else "0000-00-00",
+            rng.choice([None, 87.5, 95.12, 99.8, 101.3, 104.0]),
+            round(rng.random() * 30, 2),
+            rng.choice(["SUR", "SUR", "SUR", "USD", "CNY"]),
+        ]
+
+    @staticmethod
+    def _synthetic_schedule(row: list) -> tuple[list, list]:
+        """
+        Returns future coupons and amortizations of security row,
+        coupons are paid every coupon period back from maturity.
+        """
+        try:
+            maturity = datetime.date.fromisoformat(row[5])
+        except ValueError:
+            return [], []
+        today = datetime.date.today()
+        if maturity <= today:
+            return [], []
+        coupons = []
+        if row[4]:
+            date = maturity
+            while date > today:
+                coupons.append([date.isoformat(), row[3]])
+                date -= datetime.timedelta(days=row[4])
+        return coupons[::-1], [[maturity.isoformat(), row[2]]]
+
+    @staticmethod
+    def _synthetic_page(score: str | None) -> str:
+        filler = "".join(
+            f"<div class='row'><div>Параметр {i}</div><div>{i}</div></div>"
+            for i in range(1500)
+        )
+        rating = (
+            f"<div class='row'><div>Кредитный рейтинг</div><div>{score}</div></div>"
+            if score
+            else ""
+        )
+        return (
+            "<html><head><meta charset='utf-8'><title>Облигация</title></head>"
+            f"<body><div class='quotes'>{filler[: len(filler) // 3]}{rating}"
+            f"{filler[len(filler) // 3 :]}</div></body></html>"
+        )
+
+
+def record(directory: str, limit: int) -> None:
+    """
+    Records live ISS securities of all boardgroups and smartLab pages of first `limit` bonds.
+    """
+    import utils
+    from moex import MOEX_API
+
+    os.makedirs(os.path.join(directory, "iss"), exist_ok=True)
+    os.makedirs(os.path.join(directory, "smartlab"), exist_ok=True)
+
+    api = MOEX_API()
+    ISINs = []
+    for boardgroup in MOEX_API.BOARDGROUPS:
+        url, params = MOEX_API._boardgroup_securities_request(boardgroup)
+        api._respect_rate_limit()
+        response = api._send_request(url, params=params)
+        with open(os.path.join(directory, "iss", f"{boardgroup}.json"), "wb") as f:
+            f.write(response.content)
+        ISINs.extend(row[0] for row in response.json()["securities"]["data"])
+
+    for ISIN in ISINs[:limit]:
+        response = api.session.get(utils.SMARTLAB_URL.format(ISIN), timeout=30)
+        with open(os.path.join(directory, "smartlab", f"{ISIN}.html"), "wb") as f:
+            f.write(response.content)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    record(args.directory, args.limit)
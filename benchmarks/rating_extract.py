@@ -0,0 +1,86 @@
+"""
+Compares fast credit score extractor with BeautifulSoup one on saved smartLab pages,
+or on synthetic pages of benchmark fixtures if no pages given.
+
+Usage: python benchmarks/rating_extract.py [PAGE ...] [--repeat N]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import utils
+from fixtures import SCORES, Fixtures
+
+
+def measure(function, repeat: int) -> float:
+    """
+    Returns average time of `function` call in seconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def synthetic_pages() -> dict[str, bytes]:
+    """
+    Returns synthetic smartLab pages by name, one per fixture credit score.
+    """
+    return {
+        f"synthetic {score}": Fixtures._synthetic_page(score).encode("utf-8")
+        for score in SCORES
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pages", nargs="*", help="saved smartLab bond pages")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = synthetic_pages()
+    if args.pages:
+        pages = {}
+        for path in args.pages:
+            with open(path, "rb") as f:
+                pages[os.path.basename(path)] = f.read()
+
+    total_fast = total_bs = 0
+    mismatches = 0
+    for name, page in pages.items():
+        chunks = [
+            page[i : i + utils.SMARTLAB_CHUNK_SIZE]
+            for i in range(0, len(page), utils.SMARTLAB_CHUNK_SIZE)
+        ]
+
+        fast_score = utils._extract_credit_score(chunks)
+        bs_score = utils._extract_credit_score_BS(page.decode("utf-8", errors="replace"))
+        if fast_score != bs_score:
+            mismatches += 1
+
+        fast = measure(lambda: utils._extract_credit_score(chunks), args.repeat)
+        bs = measure(
+            lambda: utils._extract_credit_score_BS(page.decode("utf-8", errors="replace")),
+            args.repeat,
+        )
+        total_fast += fast
+        total_bs += bs
+        print(
+            f"{name}: fast {fast * 1000:.2f} ms, "
+            f"bs4 {bs * 1000:.2f} ms, x{bs / fast:.1f}, "
+            f"{'ok' if fast_score == bs_score else f'MISMATCH {fast_score!r} != {bs_score!r}'}"
+        )
+
+    print(
+        f"Total: fast {total_fast * 1000:.2f} ms, bs4 {total_bs * 1000:.2f} ms, "
+        f"x{total_bs / total_fast:.1f}, mismatches: {mismatches}"
+    )
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Offline benchmark of pipeline stages against local stand-in of MOEX ISS and smartLab.
+
+Reports wall time, peak memory and requests count of every stage for every universe size
+and saves results as JSON to compare versions.
+
+Usage: python benchmarks/run.py [--sizes 1000,10000,100000] [--fixtures DIR] [--output FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+import platform
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import utils
+import ratings
+from moex import MOEX_API
+from excel import ExcelBook
+from cache import CreditScoreCache
+from schemas import SearchCriteria
+
+from fixtures import Fixtures
+from server import StandInServer
+
+
+def measure(server: StandInServer, function, trace_memory: bool) -> tuple[dict, object]:
+    """
+    Returns measurements of function call and its result.
+    """
+    server.reset_counters()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    wall_time = time.perf_counter() - start
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {
+        "wall_time": wall_time,
+        "peak_memory": peak_memory,
+        "requests": dict(server.counters),
+    }, result
+
+
+def run_size(
+    server: StandInServer, size: int, args: argparse.Namespace, directory: str
+) -> dict:
+    """
+    Returns measurements of all stages for universe of `size` bonds.
+    """
+    server.fixtures.scale(size, MOEX_API.BOARDGROUPS)
+    criteria = SearchCriteria(face_units=None)
+    cache_file = os.path.join(directory, f"credit_scores_{size}.sqlite3")
+
+    state = {}
+
+    def get_bonds():
+        state["bonds"] = MOEX_API().get_bonds()
+        return len(state["bonds"])
+
+    def get_bond_table():
+        state["table"] = MOEX_API().get_bond_table()
+        return len(state["table"])
+
+    def filter_bonds():
+        state["filtered"] = utils.filter_bonds(state["bonds"], criteria)
+        return len(state["filtered"])
+
+    def filter_table():
+        return len(state["table"].filter(criteria).sorted_by_yield())
+
+    def with_credit_scores(cache_file: str | None):
+        def stage():
+            bonds = state["filtered"][: args.enrich_limit]
+            if cache_file is None:
+                return len(utils.with_credit_scores(bonds))
+            with CreditScoreCache(cache_file) as cache:
+                return len(utils.with_credit_scores(bonds, cache))
+
+        return stage
+
+    def with_parsed_credit_scores():
+        bonds = state["filtered"][: args.enrich_limit]
+        return len(utils.with_credit_scores(bonds, parse_workers=args.parse_workers))
+
+    def with_listing_credit_scores():
+        bonds = state["filtered"][: args.enrich_limit]
+        providers = [ratings.SmartLabListingProvider()]
+        return len(utils.with_credit_scores(bonds, providers=providers))
+
+    def write_bonds():
+        ExcelBook(os.path.join(directory, f"bonds_{size}"), write_only=True).write_bonds(
+            state["filtered"]
+        )
+        return len(state["filtered"])
+
+    # Stages with cache are not repeated to measure memory, repetition would warm cache up
+    stages = [
+        ("MOEX_API.get_bonds", get_bonds, True),
+        ("MOEX_API.get_bond_table", get_bond_table, True),
+        ("utils.filter_bonds", filter_bonds, True),
+        ("BondTable.filter", filter_table, True),
+        ("utils.with_credit_scores (no cache)", with_credit_scores(None), True),
+        ("utils.with_credit_scores (cold cache)", with_credit_scores(cache_file), False),
+        ("utils.with_credit_scores (warm cache)", with_credit_scores(cache_file), False),
+        ("utils.with_credit_scores (process pool)", with_parsed_credit_scores, True),
+        ("utils.with_credit_scores (listing)", with_listing_credit_scores, True),
+        ("ExcelBook.write_bonds", write_bonds, True),
+    ]
+
+    results = {}
+    for name, stage, repeatable in stages:
+        measurements, items = measure(server, stage, trace_memory=False)
+        if args.memory and repeatable:
+            memory, _ = measure(server, stage, trace_memory=True)
+            measurements["peak_memory"] = memory["peak_memory"]
+        measurements["items"] = items
+        results[name] = measurements
+        print(
+            f"{size:>7} {name:<40} {measurements['wall_time']:>9.3f} s "
+            f"{(measurements['peak_memory'] or 0) / 2**20:>9.1f} MiB "
+            f"{sum(measurements['requests'].values()):>6} requests"
+        )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--fixtures", help="directory of recorded fixtures")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per response")
+    parser.add_argument("--rate-limit", type=float, help="server requests per second")
+    parser.add_argument("--smartlab-rate", type=float, default=200, help="client requests per second")
+    parser.add_argument("--enrich-limit", type=int, default=500)
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--no-memory", dest="memory", action="store_false")
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    utils.SMARTLAB_RATE = args.smartlab_rate
+    utils.SMARTLAB_BURST = args.smartlab_rate
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": vars(args),
+        "sizes": {},
+    }
+    with StandInServer(
+        Fixtures(args.fixtures), args.latency, args.rate_limit
+    ) as server, tempfile.TemporaryDirectory() as directory:
+        MOEX_API.ISS_URL = f"{server.url}/iss"
+        utils.SMARTLAB_URL = f"{server.url}/q/bonds/{{}}"
+        ratings.SMARTLAB_LISTING_URL = f"{server.url}/q/bonds/page{{}}/"
+        ratings.SMARTLAB_LISTING_RATE = args.smartlab_rate
+        for size in map(int, args.sizes.split(",")):
+            report["sizes"][size] = run_size(server, size, args, directory)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results saved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Local stand-in for iss.moex.com and smart-lab.ru serving benchmark fixtures.
+"""
+
+import re
+import time
+import threading
+import collections
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from fixtures import Fixtures
+
+SECURITIES_PATH = re.compile(
+    r"^/iss/engines/stock/markets/bonds/boardgroups/(\d+)/securities\.json"
+)
+BONDIZATION_PATH = re.compile(r"^/iss/securities/([^/?]+)/bondization\.json")
+BULK_BONDIZATION_PATH = re.compile(
+    r"^/iss/statistics/engines/stock/markets/bonds/bondization\.json"
+)
+BOND_LISTING_PATH = re.compile(r"^/q/bonds/page(\d+)/")
+BOND_PAGE_PATH = re.compile(r"^/q/bonds/([^/?]+)")
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        fixtures: Fixtures,
+        latency: float = 0,
+        rate_limit: float | None = None,
+        port: int = 0,
+    ):
+        """
+        Inits StandInServer.
+        `latency` - seconds every response is delayed for.
+        `rate_limit` - maximum requests per second, exceeding requests get 429.
+        """
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.counters = collections.Counter()
+
+        self._lock = threading.Lock()
+        self._requests = collections.deque()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.counters.clear()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def is_rate_limited(self) -> bool:
+        """
+        Returns True if request exceeds rate limit within last second.
+        """
+        if self.rate_limit is None:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._requests and now - self._requests[0] > 1:
+                self._requests.popleft()
+            if len(self._requests) >= self.rate_limit:
+                return True
+            self._requests.append(now)
+            return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StandInServer
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        if self.server.is_rate_limited():
+            self.server.count("rate_limited")
+            self._respond(429, b"", "text/plain")
+            return
+
+        if match := SECURITIES_PATH.match(self.path):
+            self.server.count("iss")
+            body = self.server.fixtures.securities_json(int(match.group(1)))
+            self._respond(200, body, "application/json; charset=utf-8")
+        elif match := BONDIZATION_PATH.match(self.path):
+            self.server.count("iss_bondization")
+            body = self.server.fixtures.bondization_json(match.group(1))
+            self._respond(200, body, "application/json; charset=utf-8")
+        elif BULK_BONDIZATION_PATH.match(self.path):
+            self.server.count("iss_bulk_bondization")
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            body = self.server.fixtures.bulk_bondization_json(
+                query.get("iss.only", ["coupons,amortizations"])[0].split(","),
+                int(query.get("start", ["0"])[0]),
+                int(query.get("limit", ["100"])[0]),
+            )
+            self._respond(200, body, "application/json; charset=utf-8")
+        elif match := BOND_LISTING_PATH.match(self.path):
+            self.server.count("smartlab_listing")
+            body = self.server.fixtures.listing(int(match.group(1)))
+            self._respond(200, body, "text/html; charset=utf-8")
+        elif match := BOND_PAGE_PATH.match(self.path):
+            self.server.count("smartlab")
+            body = self.server.fixtures.page(match.group(1))
+            self._respond(200, body, "text/html; charset=utf-8")
+        else:
+            self.server.count("not_found")
+            self._respond(404, b"", "text/plain")
+
+    def _respond(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
@@ -1,2 +1,3 @@
 pyside6-uic form.ui -o ui_form.py
-pyinstaller -D -n "MOEX Bond recommendations by n1tr0xs" -w -y main.py
\ No newline at end of file
+pyinstaller -D -n "MOEX Bond recommendations by n1tr0xs" -w -y main.py
+pyinstaller -D -n "MOEX Bond recommendations CLI" -c -y --exclude-module PySide6 cli.py
\ No newline at end of file
@@ -0,0 +1,209 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger("Cache")
+
+
+class SQLiteCache:
+    TABLE = "entries"
+    KEY_COLUMN = "key"
+    VALUE_COLUMN = "value"
+    DESCRIPTION = "Кэш"
+    COMMIT_EVERY = 100  # values stored per transaction
+
+    def __init__(
+        self,
+        file_name: str,
+        ttl: float,
+        negative_ttl: float,
+        max_entries: int = 10_000,
+    ):
+        """
+        Inits SQLiteCache - persistent key-value cache with expiration and LRU eviction.
+        Access times of hits are kept in memory and written on `set` and `close`,
+        so lookups don't write to disk.
+        Stored values are committed every `COMMIT_EVERY` values and on `close`,
+        so values stored after the last commit are lost if process is killed.
+        `ttl` - seconds a known value stays valid.
+        `negative_ttl` - seconds an unknown value (see `_is_unknown`) stays valid.
+        `max_entries` - maximum amount of stored values, least recently used are evicted.
+        """
+        self.file_name = file_name
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._accessed: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(file_name, check_same_thread=False)
+        self._connection.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                {self.KEY_COLUMN} TEXT PRIMARY KEY,
+                {self.VALUE_COLUMN} TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.TABLE}_accessed_at ON {self.TABLE} (accessed_at)"
+        )
+        self._connection.commit()
+        (self._count,) = self._connection.execute(
+            f"SELECT COUNT(*) FROM {self.TABLE}"
+        ).fetchone()
+        self._uncommitted = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns cached value for key.
+        If there is no value or it is expired - returns None.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {self.VALUE_COLUMN}, fetched_at FROM {self.TABLE} WHERE {self.KEY_COLUMN} = ?",
+                (key,),
+            ).fetchone()
+            if row is None or now - row[1] > self._ttl_for(row[0]):
+                self.misses += 1
+                return None
+
+            self._accessed[key] = now
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Stores value for key, evicting least recently used values if needed.
+        """
+        now = time.time()
+        with self._lock:
+            self._flush_accessed()
+            exists = self._connection.execute(
+                f"SELECT 1 FROM {self.TABLE} WHERE {self.KEY_COLUMN} = ?", (key,)
+            ).fetchone()
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE} VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            if exists is None:
+                self._count += 1
+                self._evict()
+            self._uncommitted += 1
+            if self._uncommitted >= self.COMMIT_EVERY:
+                self._connection.commit()
+                self._uncommitted = 0
+
+    def close(self) -> None:
+        logger.info(
+            f"{self.DESCRIPTION}: попаданий {self.hits}, промахов {self.misses}."
+        )
+        with self._lock:
+            self._flush_accessed()
+            self._connection.commit()
+            self._connection.close()
+
+    def _is_unknown(self, value: str) -> bool:
+        return False
+
+    def _ttl_for(self, value: str) -> float:
+        return self.negative_ttl if self._is_unknown(value) else self.ttl
+
+    def _flush_accessed(self) -> None:
+        """
+        Writes access times of hits since last flush, so eviction sees them.
+        """
+        if not self._accessed:
+            return
+        self._connection.executemany(
+            f"UPDATE {self.TABLE} SET accessed_at = ? WHERE {self.KEY_COLUMN} = ?",
+            ((accessed_at, key) for key, accessed_at in self._accessed.items()),
+        )
+        self._accessed.clear()
+
+    def _evict(self) -> None:
+        """
+        Removes least recently used values above `self.max_entries`.
+        """
+        excess = self._count - self.max_entries
+        if excess > 0:
+            logger.info(f"Удаление {excess} устаревших записей из кэша.")
+            self._connection.execute(
+                f"""
+                DELETE FROM {self.TABLE} WHERE {self.KEY_COLUMN} IN (
+                    SELECT {self.KEY_COLUMN} FROM {self.TABLE} ORDER BY accessed_at LIMIT ?
+                )
+                """,
+                (excess,),
+            )
+            self._count -= excess
+
+
+class CreditScoreCache(SQLiteCache):
+    UNKNOWN_SCORE = "Неизвестно"
+    TABLE = "credit_scores"
+    KEY_COLUMN = "isin"
+    VALUE_COLUMN = "score"
+    DESCRIPTION = "Кэш кредитных рейтингов"
+
+    def __init__(
+        self,
+        file_name: str = "credit_scores.sqlite3",
+        ttl: float = 30 * 24 * 60 * 60,
+        negative_ttl: float = 24 * 60 * 60,
+        max_entries: int = 10_000,
+    ):
+        """
+        Inits CreditScoreCache.
+        `ttl` - seconds a known credit score stays valid.
+        `negative_ttl` - seconds an unknown credit score stays valid.
+        `max_entries` - maximum amount of stored scores, least recently used are evicted.
+        """
+        super().__init__(file_name, ttl, negative_ttl, max_entries)
+
+    def _is_unknown(self, score: str) -> bool:
+        return score == self.UNKNOWN_SCORE
+
+
+class ScheduleCache(SQLiteCache):
+    TABLE = "schedules"
+    KEY_COLUMN = "secid"
+    VALUE_COLUMN = "schedule"
+    DESCRIPTION = "Кэш графиков выплат"
+
+    def __init__(
+        self,
+        file_name: str = "schedules.sqlite3",
+        ttl: float = 7 * 24 * 60 * 60,
+        negative_ttl: float = 24 * 60 * 60,
+        max_entries: int = 20_000,
+    ):
+        """
+        Inits ScheduleCache - coupon and amortization schedules of bonds.
+        `ttl` - seconds a schedule stays valid, floating coupons are announced once a period.
+        `negative_ttl` - seconds an empty schedule stays valid.
+        """
+        super().__init__(file_name, ttl, negative_ttl, max_entries)
+
+    def get_schedule(self, SECID: str) -> dict | None:
+        value = self.get(SECID)
+        return None if value is None else json.loads(value)
+
+    def set_schedule(self, SECID: str, schedule: dict) -> None:
+        self.set(SECID, json.dumps(schedule))
+
+    def _is_unknown(self, schedule: str) -> bool:
+        return not any(json.loads(schedule).values())
@@ -0,0 +1,207 @@
+"""
+Headless entry point: finds bonds by criteria and writes them to excel file.
+"""
+
+import sys
+import logging
+import multiprocessing
+import argparse
+
+from logs import setup_logging
+from schemas import SearchCriteria, pre_tax_yield
+from profiles import PROFILES_FILE, load_profiles, save_profile
+
+logger = logging.getLogger("CLI")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    defaults = SearchCriteria()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--min-bond-yield",
+        type=float,
+        default=defaults.min_bond_yield,
+        help="minimum yield after income tax, as in GUI",
+    )
+    parser.add_argument("--max-bond-yield", type=float, default=defaults.max_bond_yield)
+    parser.add_argument(
+        "--min-days-to-maturity", type=float, default=defaults.min_days_to_maturity
+    )
+    parser.add_argument(
+        "--max-days-to-maturity", type=float, default=defaults.max_days_to_maturity
+    )
+    parser.add_argument(
+        "--face-units",
+        default=",".join(defaults.face_units),
+        help="comma separated face units, empty string for any face unit",
+    )
+    parser.add_argument("--top-n", type=int, default=defaults.top_n)
+    parser.add_argument("--min-credit-score", default=defaults.min_credit_score)
+    parser.add_argument(
+        "-o", "--output", help="output file name without extension, current date by default"
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        default="xlsx",
+        help="comma separated output formats: xlsx, csv, arrow, parquet",
+    )
+    parser.add_argument(
+        "--ratings-csv", help="CSV file with ISIN and credit_score columns looked up first"
+    )
+    parser.add_argument(
+        "--no-ratings-listing",
+        dest="ratings_listing",
+        action="store_false",
+        help="don't look credit scores up in smartLab bonds listing",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="processes parsing smartLab pages, 0 to parse in downloading threads",
+    )
+    parser.add_argument(
+        "--ytm",
+        action="store_true",
+        help="solve yields to maturity by real coupon and amortization schedules",
+    )
+    parser.add_argument(
+        "--no-history",
+        dest="history",
+        action="store_false",
+        help="don't append bonds to history store",
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        metavar="SECONDS",
+        help="keep running, refresh bonds every SECONDS and rewrite output when ranking changes",
+    )
+    parser.add_argument(
+        "--serve",
+        type=int,
+        metavar="PORT",
+        help="index all bonds and answer queries by local HTTP/JSON service on PORT, "
+        "index is refreshed every --watch SECONDS if given",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="host of --serve service")
+    parser.add_argument(
+        "--profiles",
+        nargs="?",
+        const=PROFILES_FILE,
+        metavar="FILE",
+        help="run all criteria profiles saved in FILE by one pass instead of criteria options, "
+        f"{PROFILES_FILE} by default",
+    )
+    parser.add_argument(
+        "--save-profile",
+        metavar="NAME",
+        help="save criteria options as profile NAME to --profiles FILE and exit",
+    )
+    parser.add_argument("--profile", action="store_true", help="save cProfile statistics")
+    parser.add_argument("--no-log-file", dest="log_file", action="store_false")
+    parser.add_argument(
+        "--debug", action="store_true", help="log per bond details of every stage"
+    )
+    parser.add_argument(
+        "--sync-logging",
+        dest="threaded_logging",
+        action="store_false",
+        help="write log records in logging threads instead of background thread",
+    )
+    return parser.parse_args(argv)
+
+
+def criteria_from_args(args: argparse.Namespace) -> SearchCriteria:
+    return SearchCriteria(
+        min_bond_yield=pre_tax_yield(args.min_bond_yield),
+        max_bond_yield=args.max_bond_yield,
+        min_days_to_maturity=args.min_days_to_maturity,
+        max_days_to_maturity=args.max_days_to_maturity,
+        face_units=args.face_units.split(",") if args.face_units else None,
+        top_n=args.top_n,
+        min_credit_score=args.min_credit_score,
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    setup_logging(
+        log_file=args.log_file,
+        level=logging.DEBUG if args.debug else logging.INFO,
+        threaded=args.threaded_logging,
+    )
+
+    if args.save_profile:
+        save_profile(
+            args.save_profile, criteria_from_args(args), args.profiles or PROFILES_FILE
+        )
+        return 0
+
+    import pipeline
+
+    if args.serve:
+        try:
+            pipeline.serve(
+                args.serve,
+                args.host,
+                interval=args.watch,
+                ratings_file=args.ratings_csv,
+                ratings_listing=args.ratings_listing,
+                history=args.history,
+            )
+        except KeyboardInterrupt:
+            logger.info("Сервис прерван.")
+        return 0
+
+    if args.watch:
+        try:
+            pipeline.watch(
+                criteria_from_args(args),
+                interval=args.watch,
+                file_name=args.output,
+                output_formats=args.format.split(","),
+                ratings_file=args.ratings_csv,
+                ratings_listing=args.ratings_listing,
+                history=args.history,
+            )
+        except KeyboardInterrupt:
+            logger.info("Наблюдение прервано.")
+        return 0
+
+    if args.profiles:
+        profiles = load_profiles(args.profiles)
+        if not profiles:
+            logger.error(f"В файле {args.profiles} нет профилей.")
+            return 1
+        pipeline.run_profiles(
+            profiles,
+            file_name=args.output,
+            profile=args.profile,
+            output_formats=args.format.split(","),
+            yields_to_maturity=args.ytm,
+            ratings_file=args.ratings_csv,
+            ratings_listing=args.ratings_listing,
+            parse_workers=args.parse_workers,
+            history=args.history,
+        )
+        return 0
+
+    pipeline.run(
+        criteria_from_args(args),
+        file_name=args.output,
+        profile=args.profile,
+        output_formats=args.format.split(","),
+        yields_to_maturity=args.ytm,
+        ratings_file=args.ratings_csv,
+        ratings_listing=args.ratings_listing,
+        parse_workers=args.parse_workers,
+        history=args.history,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
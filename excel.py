@@ -1,21 +1,44 @@
-﻿import datetime
-import logging
+﻿import logging
+import itertools
+from typing import Iterable
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 
 from schemas import *
+from sinks import BondSink
 
 logger = logging.getLogger("Excel")
 
 
-class ExcelBook:
-    def __init__(self, file_name: str = None, max_save_attempts: int = 5):
+class ExcelBook(BondSink):
+    EXTENSION = ".xlsx"
+    CENTER_STYLE = "Center"
+
+    def __init__(
+        self,
+        file_name: str = None,
+        max_save_attempts: int = 5,
+        write_only: bool = False,
+        width_sample_rows: int = 1000,
+    ):
+        """
+        Inits ExcelBook.
+        `write_only` - stream rows to file without keeping worksheet in memory.
+        `width_sample_rows` - amount of first rows used to fit column widths in write-only mode.
+        """
         self.file_name = self._normalize_file_name(file_name)
         self.max_save_attempts = max_save_attempts
+        self.write_only = write_only
+        self.width_sample_rows = width_sample_rows
 
-    def write_bonds(self, bond_list: list[Bond]) -> None:
+    def write_bonds(self, bond_list: Iterable[Bond]) -> None:
         """
         Writes given bond_list to excel file.
         """
+        if self.write_only:
+            self._write_bonds_streaming(bond_list)
+            return
+
         wb = openpyxl.Workbook()
         ws = wb.active
 
@@ -28,17 +51,45 @@ class ExcelBook:
 
         self._save_with_retries(wb)
 
-    @staticmethod
-    def _normalize_file_name(file_name: str | None) -> str:
+    def _write_bonds_streaming(self, bond_list: Iterable[Bond]) -> None:
         """
-        Normalizes given file name.
-        If no file name given - sets default file name to current date `%d.%m.%Y`.
+        Writes given bond_list to excel file using write-only worksheet.
+        Rows are centered by shared named style while appended.
+        Column widths are fitted to header and first `self.width_sample_rows` rows,
+        because write-only worksheet stores widths before the first row.
         """
-        if file_name is None:
-            file_name = datetime.datetime.now().strftime("%d.%m.%Y")
-        if not file_name.endswith(".xlsx"):
-            file_name += ".xlsx"
-        return file_name
+        wb = openpyxl.Workbook(write_only=True)
+        style = openpyxl.styles.NamedStyle(
+            name=self.CENTER_STYLE,
+            alignment=openpyxl.styles.Alignment(horizontal="center"),
+        )
+        wb.add_named_style(style)
+        ws = wb.create_sheet()
+
+        rows = itertools.chain([Bond.headers()], (bond.as_list for bond in bond_list))
+        sample = list(itertools.islice(rows, self.width_sample_rows + 1))
+
+        widths = [0] * len(sample[0])
+        for row in sample:
+            for i, value in enumerate(row):
+                if value:
+                    widths[i] = max(widths[i], len(str(value)))
+        for i, length in enumerate(widths, start=1):
+            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = (
+                length * 1.2
+            )
+
+        for row in itertools.chain(sample, rows):
+            ws.append([self._centered_cell(ws, value) for value in row])
+
+        self._save_with_retries(wb)
+
+    def _centered_cell(
+        self, worksheet: openpyxl.worksheet._write_only.WriteOnlyWorksheet, value
+    ) -> WriteOnlyCell:
+        cell = WriteOnlyCell(worksheet, value=value)
+        cell.style = self.CENTER_STYLE
+        return cell
 
     def _center_worksheet(
         self, worksheet: openpyxl.worksheet.worksheet.Worksheet
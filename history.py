@@ -0,0 +1,125 @@
+import os
+import logging
+import datetime
+import numpy as np
+from typing import Iterable
+
+from schemas import Bond
+
+logger = logging.getLogger("History")
+
+HISTORY_DTYPE = np.dtype(
+    [
+        ("ISIN", "U16"),
+        ("price", "f8"),
+        ("ACI", "f8"),
+        ("approximate_yield", "f8"),
+        ("yield_to_maturity", "f8"),
+        ("credit_score", "U16"),
+    ]
+)
+
+
+class HistoryStore:
+    def __init__(self, directory: str = "history"):
+        """
+        Inits HistoryStore - append-only history of bonds valuations.
+        Every date is stored as `.npy` file of fixed-width `HISTORY_DTYPE` records sorted by ISIN,
+        so files are read by memory mapping and bonds are found by binary search.
+        Files of past dates are never changed.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self._snapshots: dict[datetime.date, np.ndarray] = {}
+
+    def append(self, bonds: Iterable[Bond], date: datetime.date | None = None) -> None:
+        """
+        Stores valuations of bonds at date, today by default.
+        Bonds stored at the same date before are kept, stored again bonds are replaced.
+        Unknown values are stored as NaN or empty string.
+        If no bonds given - nothing is stored.
+        """
+        date = date or datetime.date.today()
+        records = np.array(
+            [
+                (
+                    bond.ISIN,
+                    bond.bond_price,
+                    bond.ACI,
+                    bond.approximate_yield,
+                    np.nan if bond.yield_to_maturity is None else bond.yield_to_maturity,
+                    bond.credit_score or "",
+                )
+                for bond in bonds
+            ],
+            dtype=HISTORY_DTYPE,
+        )
+        if not len(records):
+            return
+        path = self._path(date)
+        # Mapped file can't be replaced on Windows, so it is released and read into memory
+        self._snapshots.pop(date, None)
+        if os.path.exists(path):
+            old = np.load(path)
+            records = np.concatenate([records, old[~np.isin(old["ISIN"], records["ISIN"])]])
+        # Stable sort keeps the first of repeated ISINs at the first position
+        records = records[np.argsort(records["ISIN"], kind="stable")]
+        records = records[np.r_[True, records["ISIN"][1:] != records["ISIN"][:-1]]]
+
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, records)
+        os.replace(path + ".tmp", path)
+        logger.info(f"В историю за {date:%d.%m.%Y} сохранено {len(records)} облигаций.")
+
+    def dates(self) -> list[datetime.date]:
+        """
+        Returns sorted dates having stored valuations.
+        """
+        dates = []
+        for file_name in os.listdir(self.directory):
+            name, extension = os.path.splitext(file_name)
+            if extension != ".npy":
+                continue
+            try:
+                dates.append(datetime.date.fromisoformat(name))
+            except ValueError:
+                continue
+        return sorted(dates)
+
+    def snapshot(self, date: datetime.date) -> np.ndarray:
+        """
+        Returns read-only records of all bonds stored at date, sorted by ISIN.
+        If nothing is stored at date - returns empty records.
+        """
+        if date not in self._snapshots:
+            try:
+                self._snapshots[date] = np.load(self._path(date), mmap_mode="r")
+            except FileNotFoundError:
+                return np.empty(0, dtype=HISTORY_DTYPE)
+        return self._snapshots[date]
+
+    def series(
+        self,
+        ISIN: str,
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+    ) -> np.ndarray:
+        """
+        Returns records of bond at every stored date from start to end inclusive,
+        with `date` field added, sorted by date.
+        Dates the bond wasn't stored at are skipped.
+        """
+        dtype = np.dtype([("date", "datetime64[D]")] + HISTORY_DTYPE.descr)
+        rows = []
+        for date in self.dates():
+            if (start is not None and date < start) or (end is not None and date > end):
+                continue
+            snapshot = self.snapshot(date)
+            i = np.searchsorted(snapshot["ISIN"], ISIN)
+            if i < len(snapshot) and snapshot["ISIN"][i] == ISIN:
+                rows.append((np.datetime64(date, "D"), *snapshot[i].item()))
+        return np.array(rows, dtype=dtype)
+
+    def _path(self, date: datetime.date) -> str:
+        return os.path.join(self.directory, f"{date.isoformat()}.npy")
@@ -0,0 +1,118 @@
+import bisect
+import logging
+from typing import Iterable
+
+from schemas import Bond, SearchCriteria
+from utils import credit_score_rank
+
+logger = logging.getLogger("Index")
+
+
+class BondIndex:
+    def __init__(self, bonds: Iterable[Bond], partial: bool = False):
+        """
+        Inits BondIndex - in-memory index of bonds for repeated queries by `SearchCriteria`.
+        Bonds are kept sorted by days to maturity and by yield for range lookups by bisection,
+        face units and credit score ranks are mapped to positions of bonds.
+        Index is immutable, build new one to update bonds.
+        `partial` - index has only part of bonds, because their loading was cancelled.
+        """
+        self.bonds: list[Bond] = list(bonds)
+        self.partial = partial
+
+        self._by_days = sorted(
+            range(len(self.bonds)), key=lambda i: self.bonds[i].days_to_maturity
+        )
+        self._days = [self.bonds[i].days_to_maturity for i in self._by_days]
+        self._by_yield = sorted(
+            range(len(self.bonds)), key=lambda i: self.bonds[i].approximate_yield
+        )
+        self._yields = [self.bonds[i].approximate_yield for i in self._by_yield]
+
+        self._ranks: list[int | None] = []
+        self._by_face_unit: dict[str, list[int]] = {}
+        self._by_rank: dict[int, list[int]] = {}
+        for i, bond in enumerate(self.bonds):
+            rank = credit_score_rank(bond.credit_score)
+            self._ranks.append(rank)
+            self._by_face_unit.setdefault(bond.face_unit, []).append(i)
+            if rank is not None:
+                self._by_rank.setdefault(rank, []).append(i)
+        logger.info(f"Построен индекс {len(self.bonds)} облигаций.")
+
+    def __len__(self) -> int:
+        return len(self.bonds)
+
+    def query(self, criteria: SearchCriteria) -> list[Bond]:
+        """
+        Returns up to `criteria.top_n` bonds matching criteria, sorted by yield descending.
+        Candidates are taken from the most selective of days, yield, face unit and credit score
+        lookups, other criteria are checked only for them.
+        """
+        days = self._range(
+            self._days,
+            self._by_days,
+            criteria.min_days_to_maturity,
+            criteria.max_days_to_maturity,
+        )
+        yields = self._range(
+            self._yields,
+            self._by_yield,
+            criteria.min_bond_yield,
+            criteria.max_bond_yield,
+        )
+        lookups = [days, yields]
+        if criteria.face_units is not None:
+            lookups.append(
+                [
+                    i
+                    for face_unit in criteria.face_units
+                    for i in self._by_face_unit.get(face_unit, [])
+                ]
+            )
+        min_rank = credit_score_rank(criteria.min_credit_score)
+        if min_rank is not None:
+            lookups.append(
+                [
+                    i
+                    for rank, positions in self._by_rank.items()
+                    if rank <= min_rank
+                    for i in positions
+                ]
+            )
+
+        candidates = min(lookups, key=len)
+        if candidates is not yields:
+            candidates = sorted(
+                candidates, key=lambda i: self.bonds[i].approximate_yield
+            )
+
+        result = []
+        limit = criteria.top_n or len(candidates)
+        for i in reversed(candidates):
+            if self._matches(i, criteria, min_rank):
+                result.append(self.bonds[i])
+                if len(result) >= limit:
+                    break
+        return result
+
+    def _matches(self, i: int, criteria: SearchCriteria, min_rank: int | None) -> bool:
+        bond = self.bonds[i]
+        rank = self._ranks[i]
+        return (
+            criteria.min_days_to_maturity
+            <= bond.days_to_maturity
+            <= criteria.max_days_to_maturity
+            and criteria.min_bond_yield
+            <= bond.approximate_yield
+            <= criteria.max_bond_yield
+            and (criteria.face_units is None or bond.face_unit in criteria.face_units)
+            and (min_rank is None or (rank is not None and rank <= min_rank))
+        )
+
+    @staticmethod
+    def _range(keys: list, positions: list[int], low: float, high: float) -> list[int]:
+        """
+        Returns positions of bonds which keys are within [low, high], sorted by key.
+        """
+        return positions[bisect.bisect_left(keys, low) : bisect.bisect_right(keys, high)]
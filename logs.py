@@ -0,0 +1,88 @@
+import queue
+import atexit
+import logging
+import datetime
+import collections
+import logging.handlers
+
+
+def setup_logging(
+    log_file: bool = True, level: int = logging.INFO, threaded: bool = True
+) -> logging.handlers.QueueListener | None:
+    """
+    Sets up logging to stderr and, if `log_file`, to file named by current date `%d.%m.%Y.log`.
+    If `threaded` - records are put to queue and handled by listener thread,
+    so formatting and writing don't slow down logging threads.
+    Returns started listener, which is also stopped at exit, or None.
+    """
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.insert(
+            0,
+            logging.FileHandler(
+                f"{datetime.datetime.now().strftime('%d.%m.%Y')}.log",
+                mode="w",
+                encoding="utf-8",
+            ),
+        )
+    formatter = logging.Formatter(
+        fmt="%(asctime)s - %(name)s:%(levelname)s - %(message)s",
+        datefmt="%d.%m.%Y %H:%M:%S",
+    )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    listener = None
+    if threaded:
+        records = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(records, *handlers)
+        listener.start()
+        atexit.register(listener.stop)
+        queue_handler = logging.handlers.QueueHandler(records)
+        # Records are formatted by listener handlers, here only message is merged
+        queue_handler.setFormatter(logging.Formatter("%(message)s"))
+        handlers = [queue_handler]
+
+    logging.basicConfig(level=level, handlers=handlers)
+    return listener
+
+
+class StageSummary:
+    MAX_SAMPLES = 3
+
+    def __init__(self, logger: logging.Logger, stage: str):
+        """
+        Inits StageSummary - counts of items processed by stage per outcome,
+        logged as one line instead of line per item.
+        """
+        self.logger = logger
+        self.stage = stage
+        self.counts: collections.Counter = collections.Counter()
+        self.samples: dict[str, list] = {}
+
+    def add(self, outcome: str, sample=None, count: int = 1) -> None:
+        """
+        Counts `count` items with outcome.
+        If sample given - it is kept as example of outcome, up to `MAX_SAMPLES` per outcome.
+        """
+        self.counts[outcome] += count
+        if sample is not None:
+            samples = self.samples.setdefault(outcome, [])
+            if len(samples) < self.MAX_SAMPLES:
+                samples.append(sample)
+
+    def log(self) -> None:
+        """
+        Logs counts of outcomes and, as warnings, kept samples.
+        """
+        outcomes = ", ".join(
+            f"{outcome} - {count}" for outcome, count in self.counts.most_common()
+        )
+        self.logger.info(
+            f"{self.stage}: всего {sum(self.counts.values())}"
+            + (f" ({outcomes})." if outcomes else ".")
+        )
+        for outcome, samples in self.samples.items():
+            self.logger.warning(
+                f"{self.stage}: {outcome} - {self.counts[outcome]}, примеры: {samples}."
+            )
@@ -1,82 +1,194 @@
-﻿import sys
-import datetime
+﻿import os
+import sys
 import logging
+import datetime
+import threading
+import multiprocessing
 from PySide6.QtWidgets import QApplication, QWidget
-from PySide6.QtCore import QObject, Signal, QThread
+from PySide6.QtCore import (
+    QAbstractTableModel,
+    QModelIndex,
+    QObject,
+    Qt,
+    QThread,
+    QTimer,
+    Signal,
+)
 
-from moex import MOEX_API
-from excel import ExcelBook
-import utils
-from schemas import Bond, SearchCriteria
+import pipeline
+from logs import setup_logging
+from metrics import RunMetrics
+from schemas import Bond, SearchCriteria, pre_tax_yield
 
 from ui_form import Ui_Widget
 
-class Worker(QObject):
-    finished = Signal()
-    progress = Signal(int)
-    
-    def __init__(self, search_criteria: SearchCriteria, parent=None):
+class BondTableModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        """
+        Inits BondTableModel - bonds shown as rows of `Bond.headers` columns.
+        """
         super().__init__(parent)
-        self.search_criteria = search_criteria
+        self.bonds: list[Bond] = []
+        self._rows: list[list] = []
+        self._headers = Bond.headers()
 
-    def emit_step(self, step:int, total_steps:int) -> int:
-        self.progress.emit(step/total_steps*100)
-        return step + 1
-    
-    def run(self):
-        step = 0
-        total_steps = 6
-        logger.info(f"Начало работы")
-        
-        moex_api = MOEX_API()
-        step = self.emit_step(step, total_steps)
+    def set_bonds(self, bonds: list[Bond]) -> None:
+        self.beginResetModel()
+        self.bonds = bonds
+        self._rows = [bond.as_list for bond in bonds]
+        self.endResetModel()
 
-        bonds: list[Bond] = moex_api.get_bonds()
-        step = self.emit_step(step, total_steps)
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
 
-        bonds: list[Bond] = utils.filter_bonds(bonds, self.search_criteria)
-        step = self.emit_step(step, total_steps)
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._headers)
 
-        bonds: list[Bond] = utils.with_credit_scores(bonds)
-        step = self.emit_step(step, total_steps)
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole:
+            value = self._rows[index.row()][index.column()]
+            return "" if value is None else str(value)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
 
-        bonds.sort(key=lambda b: -b.approximate_yield)
-        step = self.emit_step(step, total_steps)
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self._headers[section]
+        return super().headerData(section, orientation, role)
 
-        book = ExcelBook()
-        step = self.emit_step(step, total_steps)
+class Worker(QObject):
+    finished = Signal()
+    progress = Signal(int)
+    partial = Signal(object)
+    loaded = Signal(object)
+    report = Signal(object)
+    
+    def __init__(
+        self,
+        criteria: SearchCriteria | None = None,
+        profile: bool = False,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.criteria = criteria
+        self.profile = profile
+        self.stop = threading.Event()
 
-        book.write_bonds(bonds)
-        step = self.emit_step(step, total_steps)
+    def cancel(self):
+        """
+        Stops loading before the next request, bonds loaded so far are still emitted by `loaded`
+        as partial index.
+        Called directly from GUI thread, because worker thread is busy in `run`.
+        """
+        self.stop.set()
 
-        logger.info(f"Конец работы")
+    def run(self):
+        metrics = RunMetrics(profile=self.profile)
+        with metrics.profile():
+            index = pipeline.load_index(
+                progress=lambda percent: self.progress.emit(int(percent)),
+                metrics=metrics,
+                stop=self.stop,
+                on_batch=self.partial.emit,
+                criteria=self.criteria,
+            )
+        self.loaded.emit(index)
+        self.report.emit(metrics)
         self.finished.emit()
 
 class Widget(QWidget):
+    STALENESS_UPDATE_INTERVAL = 30 * 1000  # milliseconds
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.ui = Ui_Widget()
         self.ui.setupUi(self)
-        
+
+        # Last fetched bonds with credit scores, criteria changes are applied to them locally
+        self.index = None
+        # Last completely loaded index, shown again if next loading is cancelled
+        self.complete_index = None
+        self.loaded_at: datetime.datetime | None = None
+        self.pending_save = False
+        self.loading = False
+        # Bonds received while loading, shown before loading is finished
+        self.partial_bonds: list[Bond] = []
+
+        self.model = BondTableModel(self)
+        self.ui.bondsTableView.setModel(self.model)
+
+        self.staleness_timer = QTimer(self)
+        self.staleness_timer.timeout.connect(self.updateDataAge)
+        self.staleness_timer.start(self.STALENESS_UPDATE_INTERVAL)
+
         self.ui.buttonStart.clicked.connect(self.onBtnClick)
+        self.ui.buttonRefresh.clicked.connect(self.refreshData)
+        self.ui.buttonCancel.clicked.connect(self.cancelLoading)
+        for spin_box in (
+            self.ui.minBondYieldSpinBox,
+            self.ui.topBondsSpinBox,
+            self.ui.minDaysToMaturitySpinBox,
+            self.ui.maxDaysToMaturitySpinBox,
+        ):
+            spin_box.valueChanged.connect(self.refilter)
+        self.ui.minCreditScoreComboBox.currentIndexChanged.connect(self.refilter)
 
-    def onBtnClick(self):       
+    def searchCriteria(self) -> SearchCriteria:
         # Search criteria setup
         INF = float("inf")
-        min_yield = self.ui.minBondYieldSpinBox.value() / 0.87
+        min_yield = pre_tax_yield(self.ui.minBondYieldSpinBox.value())
         min_days = self.ui.minDaysToMaturitySpinBox.value()
         max_days = self.ui.maxDaysToMaturitySpinBox.value() or INF
+        top_n = self.ui.topBondsSpinBox.value() or None
+        min_credit_score = (
+            self.ui.minCreditScoreComboBox.currentText()
+            if self.ui.minCreditScoreComboBox.currentIndex()
+            else None
+        )
 
-        search_criteria: SearchCriteria = SearchCriteria(
+        return SearchCriteria(
             min_bond_yield=min_yield,
             max_bond_yield=INF,
             min_days_to_maturity=min_days,
             max_days_to_maturity=max_days,
             face_units=None,
+            top_n=top_n,
+            min_credit_score=min_credit_score,
         )
 
+    def onBtnClick(self):
+        """
+        Saves shown bonds to excel file, loads data first if it isn't loaded yet.
+        """
+        if self.index is None:
+            self.pending_save = True
+            self.refreshData()
+            return
+        self.saveBonds()
+
+    def saveBonds(self):
+        from sinks import create_sink
+
+        create_sink("xlsx").write_bonds(self.model.bonds)
+
+    def refilter(self):
+        """
+        Applies current criteria to the last loaded data without network requests.
+        """
+        if self.index is None:
+            return
+        self.model.set_bonds(self.index.query(self.searchCriteria()))
+        self.ui.bondsTableView.resizeColumnsToContents()
+
+    def refreshData(self):
+        self.loading = True
+        self.partial_bonds = []
         self.thread_ = QThread()
-        self.worker = Worker(search_criteria)
+        self.worker = Worker(
+            criteria=self.searchCriteria(),
+            profile=bool(os.environ.get("MOEX_PROFILE")),
+        )
 
         self.worker.moveToThread(self.thread_)
         
@@ -87,30 +199,90 @@ class Widget(QWidget):
         self.thread_.finished.connect(self.thread_.deleteLater)
 
         self.worker.progress.connect(self.ui.progressBar.setValue)
+        self.worker.partial.connect(self.onPartialData)
+        self.worker.loaded.connect(self.onDataLoaded)
+        self.worker.report.connect(self.saveReport)
 
         self.thread_.start()
         self.ui.buttonStart.setEnabled(False)
-        self.thread_.finished.connect(lambda: self.ui.buttonStart.setEnabled(True))
-
-# Logger setup
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s:%(levelname)s - %(message)s",
-    datefmt="%d.%m.%Y %H:%M:%S",
-    handlers=[
-        logging.FileHandler(
-            f"{datetime.datetime.now().strftime("%d.%m.%Y")}.log",
-            mode="w",
-            encoding="utf-8",
-        ),
-        logging.StreamHandler(),
-    ],
-)
+        self.ui.buttonRefresh.setEnabled(False)
+        self.ui.buttonCancel.setEnabled(True)
+        self.thread_.finished.connect(self.onLoadingFinished)
+
+    def cancelLoading(self):
+        if not self.loading:
+            return
+        self.pending_save = False
+        self.ui.buttonCancel.setEnabled(False)
+        self.worker.cancel()
+
+    def onLoadingFinished(self):
+        self.loading = False
+        self.ui.buttonStart.setEnabled(True)
+        self.ui.buttonRefresh.setEnabled(True)
+        self.ui.buttonCancel.setEnabled(False)
+
+    def onPartialData(self, bonds: list[Bond]):
+        """
+        Shows bonds received so far, so the best ones can be seen before loading is finished.
+        """
+        from index import BondIndex
+
+        self.partial_bonds.extend(bonds)
+        self.index = BondIndex(self.partial_bonds)
+        self.refilter()
+
+    def onDataLoaded(self, index):
+        """
+        Shows loaded bonds. If loading was cancelled - the last complete data is shown again,
+        if there is no such data - loaded bonds are shown as incomplete, data age isn't updated.
+        """
+        if index.partial:
+            if self.complete_index is not None:
+                self.index = self.complete_index
+            else:
+                self.index = index
+                self.ui.dataAgeLabel.setText("Неполные данные: загрузка прервана")
+            self.refilter()
+            return
+
+        self.index = self.complete_index = index
+        self.loaded_at = datetime.datetime.now()
+        self.updateDataAge()
+        self.refilter()
+        if self.pending_save:
+            self.pending_save = False
+            self.saveBonds()
+
+    def saveReport(self, metrics: RunMetrics):
+        """
+        Saves run report named by current date, as headless runs do.
+        """
+        metrics.save(f"{datetime.datetime.now().strftime('%d.%m.%Y')}.json")
+
+    def closeEvent(self, event):
+        if self.loading:
+            self.worker.cancel()
+            self.thread_.quit()
+            self.thread_.wait()
+        super().closeEvent(event)
+
+    def updateDataAge(self):
+        if self.loaded_at is None:
+            return
+        minutes = int((datetime.datetime.now() - self.loaded_at).total_seconds() // 60)
+        self.ui.dataAgeLabel.setText(
+            f"Данные от {self.loaded_at:%d.%m.%Y %H:%M} ({minutes} мин. назад)"
+        )
 
 logger = logging.getLogger("Main")
 
 if __name__ == "__main__":
     # main()
+    multiprocessing.freeze_support()
+    setup_logging(
+        level=logging.DEBUG if os.environ.get("MOEX_DEBUG") else logging.INFO
+    )
     app = QApplication(sys.argv)
     widget = Widget()
     widget.show()
@@ -0,0 +1,133 @@
+import json
+import time
+import pstats
+import logging
+import cProfile
+import threading
+import contextlib
+import collections
+from typing import TYPE_CHECKING
+from dataclasses import dataclass, asdict
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger("Metrics")
+
+
+@dataclass
+class RequestRecord:
+    url: str
+    status: int | None
+    duration: float
+    bytes: int
+    retries: int
+    rate_limit_wait: float
+
+
+class RunMetrics:
+    def __init__(self, profile: bool = False):
+        """
+        Inits RunMetrics - durations of pipeline stages, HTTP requests and counters of one run.
+        `profile` - also collect cProfile statistics of the run.
+        """
+        self.stages: dict[str, float] = {}
+        self.requests: list[RequestRecord] = []
+        self.counters: collections.Counter = collections.Counter()
+        self.profiler = cProfile.Profile() if profile else None
+
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        Measures duration of code block as pipeline stage `name`.
+        """
+        logger.info(f"Этап {name}.")
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0) + duration
+            logger.info(f"Этап {name} занял {duration:.2f} секунд.")
+
+    @contextlib.contextmanager
+    def profile(self):
+        """
+        Collects cProfile statistics of code block if profiling is enabled.
+        """
+        if self.profiler is None:
+            yield
+            return
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+
+    def record_request(
+        self,
+        url: str,
+        start: float,
+        response: "requests.Response | None",
+        rate_limit_wait: float = 0,
+    ) -> None:
+        """
+        Records HTTP request started at `start` (`time.perf_counter`) with already consumed response.
+        """
+        status = size = None
+        retries = 0
+        if response is not None:
+            status = response.status_code
+            raw = response.raw
+            size = raw.tell() if hasattr(raw, "tell") else len(response.content)
+            if getattr(raw, "retries", None) is not None:
+                retries = len(raw.retries.history)
+
+        record = RequestRecord(
+            url=url,
+            status=status,
+            duration=time.perf_counter() - start,
+            bytes=size or 0,
+            retries=retries,
+            rate_limit_wait=rate_limit_wait,
+        )
+        with self._lock:
+            self.requests.append(record)
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += value
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            requests_total = {
+                "count": len(self.requests),
+                "duration": sum(r.duration for r in self.requests),
+                "bytes": sum(r.bytes for r in self.requests),
+                "retries": sum(r.retries for r in self.requests),
+                "rate_limit_wait": sum(r.rate_limit_wait for r in self.requests),
+                "failed": sum(r.status is None or r.status >= 400 for r in self.requests),
+            }
+            return {
+                "stages": dict(self.stages),
+                "requests_total": requests_total,
+                "counters": dict(self.counters),
+                "requests": [asdict(r) for r in self.requests],
+            }
+
+    def save(self, file_name: str) -> None:
+        """
+        Saves metrics as JSON report to file_name.
+        If profiling is enabled - also saves cProfile statistics next to it with `.prof` extension.
+        """
+        with open(file_name, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2)
+        logger.info(f"Отчет о работе сохранен: {file_name}.")
+
+        if self.profiler is not None:
+            profile_name = file_name.rsplit(".", 1)[0] + ".prof"
+            pstats.Stats(self.profiler).dump_stats(profile_name)
+            logger.info(f"Профиль сохранен: {profile_name}.")
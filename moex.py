@@ -1,111 +1,419 @@
 ﻿import time
 import logging
+import datetime
 import requests
+import urllib3
+from typing import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from network import TokenBucket, create_session
 from schemas import *
+from table import BondTable
+from snapshot import SecuritiesDelta, SnapshotStore
+from cache import ScheduleCache
+from metrics import RunMetrics
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 logger = logging.getLogger("MOEX")
 
 
 class MOEX_API:
-    API_DELAY = round(60 / 50, 1)
+    API_REQUESTS_PER_MINUTE = 50
+    API_BURST = 5
+    API_TIMEOUT = 30
+    ISS_URL = "https://iss.moex.com/iss"
     BOARDGROUPS = [7, 58, 105]
+    # Bulk schedules of the whole market take hundreds of pages,
+    # so they pay off only when more schedules are missing
+    BULK_SCHEDULES_MIN = 300
+    BULK_SCHEDULES_PAGE_SIZE = 100
 
-    def __init__(self):
+    def __init__(self, max_workers: int = 4, metrics: RunMetrics | None = None):
         """
         Inits MOEX_API.
+        `max_workers` - maximum amount of concurrent requests.
+        `metrics` - if given, all requests are recorded to it.
         """
-        self.last_api_request = None
-        self.session = requests.Session()
+        self.max_workers = max_workers
+        self.metrics = metrics
+        # Burst tokens are subtracted from the rate so any minute stays under the limit
+        self.limiter = TokenBucket(
+            (self.API_REQUESTS_PER_MINUTE - self.API_BURST) / 60, self.API_BURST
+        )
+        self.session = create_session(pool_size=max_workers)
 
     def get_bonds(self) -> list[Bond]:
         """
         Returns all bonds from all boardgroups specified in `MOEX_API.BOARDGROUPS`.
+        Boardgroups are requested concurrently.
+        Security listed on several boardgroups is taken from the first one in `BOARDGROUPS` order.
+        """
+        return self.get_bond_table().to_bonds()
+
+    def get_bond_table(self) -> BondTable:
+        """
+        Returns table of all bonds from all boardgroups specified in `MOEX_API.BOARDGROUPS`.
+        Boardgroups are requested concurrently.
+        Security listed on several boardgroups is taken from the first one in `BOARDGROUPS` order,
+        so it is parsed and enriched once.
+        """
+        securities = {}
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            for boardgroup_securities in executor.map(
+                self.fetch_boardgroup_securities, self.BOARDGROUPS
+            ):
+                for SECID, row in boardgroup_securities.items():
+                    securities.setdefault(SECID, row)
+        logger.info(f"Всего обнаружено {len(securities)} бумаг.")
+        table, rejected = BondTable.ingest(securities.values())
+        self._count_rejected(rejected)
+        return table
+
+    def sync_bond_table(self, store: SnapshotStore) -> tuple[BondTable, SecuritiesDelta]:
+        """
+        Returns table of all bonds from all boardgroups and changes since last stored snapshots.
+        Only changed securities are parsed, unchanged boardgroups are not downloaded again
+        if server supports conditional requests.
+        Security listed on several boardgroups is taken from the first one in `BOARDGROUPS` order.
+        """
+        tables = []
+        delta = SecuritiesDelta()
+        for table, boardgroup_delta in self.iter_bond_tables(store):
+            tables.append(table)
+            delta.extend(boardgroup_delta)
+        logger.info(
+            f"Изменения: добавлено {len(delta.added)}, удалено {len(delta.removed)}, изменено {len(delta.changed)} бумаг."
+        )
+        return BondTable.concat(tables).drop_duplicates(), delta
+
+    def iter_bond_tables(
+        self, store: SnapshotStore
+    ) -> Iterator[tuple[BondTable, SecuritiesDelta]]:
+        """
+        Yields table of bonds and changes since last stored snapshot for every boardgroup.
+        Boardgroups are requested concurrently and yielded in `BOARDGROUPS` order,
+        so `BondTable.drop_duplicates` of concatenated tables keeps the first boardgroup.
+        """
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            futures = [
+                executor.submit(self.sync_boardgroup_table, boardgroup, store)
+                for boardgroup in self.BOARDGROUPS
+            ]
+            for future in futures:
+                yield future.result()
+
+    def sync_boardgroup_table(
+        self, boardgroup: str, store: SnapshotStore
+    ) -> tuple[BondTable, SecuritiesDelta]:
+        """
+        Returns table of bonds from specified boardgroup and changes since last stored snapshot.
+        If boardgroup can't be downloaded - last snapshot is used.
+        """
+        logger.info(f"Синхронизация данных для группы {boardgroup}.")
+        snapshot = store.load(boardgroup)
+        url, params = self._boardgroup_securities_request(boardgroup)
+
+        response, securities = self._get_securities(
+            url, params=params, headers=snapshot.conditional_headers
+        )
+        if securities is not None:
+            snapshot, delta = store.update(
+                boardgroup,
+                securities,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        else:
+            if response is None or response.status_code != 304:
+                logger.warning(f"Используется сохраненный снимок группы {boardgroup}.")
+            snapshot, delta = store.update(
+                boardgroup,
+                snapshot.securities,
+                etag=snapshot.etag,
+                last_modified=snapshot.last_modified,
+            )
+        self._count_rejected(snapshot.rejected or {})
+        return snapshot.table, delta
+
+    def _count_rejected(self, rejected: dict[str, str]) -> None:
         """
-        bonds = []
-        for b in self.BOARDGROUPS:
-            bonds.extend(self.get_boardgroup_bonds(b))
-        return bonds
+        Adds counts of securities rejected by reason to metrics, see `BondTable.ingest`.
+        """
+        if self.metrics is None:
+            return
+        for reason, count in BondTable.rejection_counts(rejected).items():
+            self.metrics.count(f"rejected_rows: {reason}", count)
 
     def get_boardgroup_bonds(self, boardgroup: str) -> list[Bond]:
         """
         Returns all bonds from specified boardgroup.
         """
         logger.info(f"Запрос данных для группы {boardgroup}.")
-        bonds = []
         securities = self.fetch_boardgroup_securities(boardgroup)
         logger.info(f"В группе {boardgroup} обнаружено {len(securities)} бумаг.")
-        for i, ISIN in enumerate(securities, start=1):
-            logger.info(f"Обработка {i}/{len(securities)} - {ISIN}.")
-
-            bond_data = securities[ISIN]
-            try:
-                bonds.append(Bond.from_list(bond_data))
-            except Exception as e:
-                logger.warning(
-                    f"Ошибка при получении информации по {ISIN}. Информация по облигации: {bond_data}."
-                )
-
-        return bonds
+        return BondTable.from_rows(securities.values()).to_bonds()
 
     def fetch_boardgroup_securities(self, boardgroup: str) -> dict:
         """
         Returns dictionary of securities found on specified boardgroup.
         Format of dictionary: ISIN -> security_data
         """
-        url = f"https://iss.moex.com/iss/engines/stock/markets/bonds/boardgroups/{boardgroup}/securities.json"
+        url, params = self._boardgroup_securities_request(boardgroup)
+        _, securities = self._get_securities(url, params=params)
+        return securities or {}
+
+    def get_schedules(
+        self, SECIDs: Iterable[str], cache: ScheduleCache | None = None
+    ) -> dict[str, dict]:
+        """
+        Returns coupon and amortization schedules of specified securities.
+        Format of dictionary: SECID -> {"coupons": [[date, value], ...], "amortizations": [[date, value], ...]}
+        Cached schedules are not requested. If at least `BULK_SCHEDULES_MIN` are missing -
+        future payments of all bonds are requested in pages, see `get_bulk_schedules`.
+        Remaining missing schedules are requested one per security concurrently.
+        Securities which schedule couldn't be downloaded are omitted.
+        """
+        schedules = {}
+        missing = []
+        for SECID in SECIDs:
+            schedule = cache.get_schedule(SECID) if cache is not None else None
+            if schedule is None:
+                missing.append(SECID)
+            else:
+                schedules[SECID] = schedule
+
+        logger.info(
+            f"Графики выплат: в кэше {len(schedules)}, требуется загрузить {len(missing)}."
+        )
+        if len(missing) >= self.BULK_SCHEDULES_MIN:
+            bulk_schedules = self.get_bulk_schedules()
+            remaining = []
+            for SECID in missing:
+                if SECID not in bulk_schedules:
+                    remaining.append(SECID)
+                    continue
+                schedules[SECID] = bulk_schedules[SECID]
+                if cache is not None:
+                    cache.set_schedule(SECID, schedules[SECID])
+            missing = remaining
+            logger.info(f"Графики выплат: загружаются по одному {len(missing)}.")
+
+        with ThreadPoolExecutor(self.max_workers) as executor:
+            for SECID, schedule in zip(missing, executor.map(self.get_schedule, missing)):
+                if schedule is None:
+                    continue
+                schedules[SECID] = schedule
+                if cache is not None:
+                    cache.set_schedule(SECID, schedule)
+        return schedules
+
+    def get_schedule(self, SECID: str) -> dict | None:
+        """
+        Returns coupon and amortization schedule of specified security.
+        If request failed - returns None.
+        """
+        url, params = self._bondization_request(SECID)
+        data = self._get_json(url, params=params)
+        if "coupons" not in data or "amortizations" not in data:
+            return None
+        return {
+            "coupons": data["coupons"]["data"],
+            "amortizations": data["amortizations"]["data"],
+        }
+
+    def get_bulk_schedules(self) -> dict[str, dict]:
+        """
+        Returns schedules of future payments of all bonds, see `get_schedules`.
+        Coupons and amortizations are requested in pages of `BULK_SCHEDULES_PAGE_SIZE` rows
+        until block is exhausted.
+        If any page request failed - returns no schedules, so incomplete schedules are never taken.
+        """
+        url, params = self._bulk_bondization_request()
+        blocks = {"coupons": [], "amortizations": []}
+        remaining = list(blocks)
+        start = 0
+        while remaining:
+            data = self._get_json(
+                url, params={**params, "iss.only": ",".join(remaining), "start": start}
+            )
+            if any(block not in data for block in remaining):
+                logger.warning("Не удалось загрузить графики выплат всех облигаций.")
+                return {}
+            for block in list(remaining):
+                rows = data[block]["data"]
+                blocks[block].extend(rows)
+                if len(rows) < self.BULK_SCHEDULES_PAGE_SIZE:
+                    remaining.remove(block)
+            start += self.BULK_SCHEDULES_PAGE_SIZE
+
+        schedules = {}
+        for block, rows in blocks.items():
+            for SECID, date, value in rows:
+                schedule = schedules.setdefault(
+                    SECID, {"coupons": [], "amortizations": []}
+                )
+                schedule[block].append([date, value])
+        logger.info(f"Загружены графики выплат {len(schedules)} облигаций.")
+        return schedules
+
+    @classmethod
+    def _bulk_bondization_request(cls) -> tuple[str, dict]:
+        """
+        Returns URL and params of request for future coupons and amortizations of all bonds.
+        Request is paged, `iss.only` and `start` are set per page.
+        """
+        url = f"{cls.ISS_URL}/statistics/engines/stock/markets/bonds/bondization.json"
+        params = {
+            "iss.meta": "off",
+            "from": datetime.date.today().isoformat(),
+            "limit": cls.BULK_SCHEDULES_PAGE_SIZE,
+            "coupons.columns": "secid,coupondate,value",
+            "amortizations.columns": "secid,amortdate,value",
+        }
+        return url, params
+
+    @classmethod
+    def _bondization_request(cls, SECID: str) -> tuple[str, dict]:
+        """
+        Returns URL and params of request for coupons and amortizations of specified security.
+        """
+        url = f"{cls.ISS_URL}/securities/{SECID}/bondization.json"
+        params = {
+            "iss.meta": "off",
+            "iss.only": "coupons,amortizations",
+            "limit": "unlimited",
+            "coupons.columns": "coupondate,value",
+            "amortizations.columns": "amortdate,value",
+        }
+        return url, params
+
+    @classmethod
+    def _boardgroup_securities_request(cls, boardgroup: str) -> tuple[str, dict]:
+        """
+        Returns URL and params of request for securities of specified boardgroup.
+        """
+        url = f"{cls.ISS_URL}/engines/stock/markets/bonds/boardgroups/{boardgroup}/securities.json"
         params = {
             "iss.dp": "comma",
             "iss.meta": "off",
             "iss.only": "securities",
             "securities.columns": "SECID,SHORTNAME,FACEVALUE,COUPONVALUE,COUPONPERIOD,MATDATE,PREVLEGALCLOSEPRICE,ACCRUEDINT,FACEUNIT",
         }
-        json = self._get_json(url, params=params)
-        securities = json.get("securities", {}).get("data", {})
-        return {item[0]: item for item in securities}
+        return url, params
+
+    def _get_securities(
+        self, url: str, params: dict | None = None, headers: dict | None = None
+    ) -> tuple[requests.Response | None, dict | None]:
+        """
+        Returns response and dictionary of securities from the specified URL,
+        taking into account the delay between requests.
+        If request failed or securities are not modified - securities are None.
+        """
+        wait_time = self._respect_rate_limit()
+        start = time.perf_counter()
+        response = self._send_request(url, params=params, headers=headers, stream=True)
+        securities = None
+        if response is not None:
+            if response.status_code != 304:
+                securities = self._securities_from_response(response)
+            response.close()
+        self._record_request(url, start, response, wait_time)
+        return response, securities
+
+    def _securities_from_response(self, response: requests.Response) -> dict | None:
+        """
+        Returns dictionary of securities from ISS JSON response.
+        Format of dictionary: ISIN -> security_data
+        If body can't be read completely or parsed - returns None as for failed request,
+        so partial data is never taken for all securities.
+        """
+        errors = (requests.RequestException, urllib3.exceptions.HTTPError, ValueError)
+        if ijson is not None:
+            errors += (ijson.JSONError,)
+        try:
+            return {item[0]: item for item in self._iter_securities(response)}
+        except errors as e:
+            logger.warning(f"Не удалось получить данные бумаг: {e}.")
+            return None
+
+    def _iter_securities(self, response: requests.Response) -> Iterator[list]:
+        """
+        Yields securities data from ISS JSON response.
+        If ijson is installed - response is parsed incrementally while downloading.
+        Errors of reading or parsing body are raised.
+        """
+        if ijson is None:
+            yield from response.json().get("securities", {}).get("data", [])
+            return
+
+        response.raw.decode_content = True
+        try:
+            yield from ijson.items(
+                response.raw, "securities.data.item", use_float=True
+            )
+        finally:
+            response.close()
 
     def _get_json(self, url: str, params: dict | None = None) -> dict:
         """
         Returns JSON from the specified URL, taking into account the delay between requests.
         """
-        self._respect_rate_limit()
+        wait_time = self._respect_rate_limit()
+        start = time.perf_counter()
         response = self._send_request(url, params=params)
+        self._record_request(url, start, response, wait_time)
         if not response:
             return {}
         return self._parse_json(response)
 
-    def _respect_rate_limit(self) -> None:
+    def _respect_rate_limit(self) -> float:
         """
         Waits time if needed to respect requests rate limit.
+        Returns waited time in seconds.
         """
-        now = datetime.datetime.now()
-        if self.last_api_request:
-            delta = (now - self.last_api_request).total_seconds()
-            wait_time = self.API_DELAY - delta
-            if wait_time > 0:
-                logger.info(f"Ожидание {wait_time:.2f} секунд...")
-                time.sleep(self.API_DELAY - delta)
+        wait_time = self.limiter.acquire()
+        if wait_time > 0:
+            logger.info(f"Ожидание {wait_time:.2f} секунд...")
+        return wait_time
 
-        self.last_api_request = datetime.datetime.now()
+    def _record_request(
+        self,
+        url: str,
+        start: float,
+        response: requests.Response | None,
+        wait_time: float,
+    ) -> None:
+        if self.metrics is not None:
+            self.metrics.record_request(url, start, response, wait_time)
 
     def _send_request(
-        self, url: str, params: dict | None = None
+        self,
+        url: str,
+        params: dict | None = None,
+        headers: dict | None = None,
+        stream: bool = False,
     ) -> requests.Response | None:
-        r = requests.Request("GET", url, params=params)
+        r = requests.Request("GET", url, params=params, headers=headers)
         prepared = self.session.prepare_request(r)
 
         logger.info(f"Запрос к {prepared.url}.")
 
         try:
-            response = self.session.send(prepared)
+            response = self.session.send(
+                prepared, timeout=self.API_TIMEOUT, stream=stream
+            )
             response.raise_for_status()
             return response
-        except:
-            logger.warning(f"Не удалось установить соединение.")
+        except requests.RequestException as e:
+            logger.warning(f"Не удалось установить соединение: {e}.")
             return None
 
     def _parse_json(self, response: requests.Response) -> dict:
         try:
             return response.json()
-        except:
+        except ValueError:
             logger.warning(f"Не удалось получить json.")
             return {}
@@ -0,0 +1,78 @@
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger("Network")
+
+
+class Cancelled(Exception):
+    """
+    Raised by operations interrupted by stop event.
+    """
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1):
+        """
+        Inits TokenBucket.
+        `rate` - tokens added per second.
+        `capacity` - maximum amount of tokens, i.e. allowed burst size.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop: threading.Event | None = None) -> float:
+        """
+        Blocks until token is available and takes it.
+        Returns time spent waiting in seconds.
+        If stop is set before or while waiting - raises `Cancelled`.
+        """
+        waited = 0
+        while True:
+            if stop is not None and stop.is_set():
+                raise Cancelled()
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait_time = (1 - self._tokens) / self.rate
+
+            if stop is not None:
+                stop.wait(wait_time)
+            else:
+                time.sleep(wait_time)
+            waited += wait_time
+
+
+def create_session(
+    pool_size: int = 10, retries: int = 3, backoff_factor: float = 0.5
+) -> requests.Session:
+    """
+    Returns session with connection pool of `pool_size` keep-alive connections.
+    Failed GET requests are retried `retries` times with exponential backoff.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
@@ -0,0 +1,386 @@
+import os
+import time
+import logging
+import contextlib
+import datetime
+import threading
+from typing import Callable, Iterable
+
+from schemas import Bond, SearchCriteria
+from metrics import RunMetrics
+
+logger = logging.getLogger("Pipeline")
+
+
+def run(
+    criteria: SearchCriteria,
+    file_name: str | None = None,
+    progress: Callable[[float], None] | None = None,
+    profile: bool = False,
+    output_formats: Iterable[str] = ("xlsx",),
+    yields_to_maturity: bool = False,
+    ratings_file: str | None = None,
+    ratings_listing: bool = True,
+    parse_workers: int = 0,
+    history: bool = True,
+) -> RunMetrics:
+    """
+    Fetches bonds, filters them by criteria, adds credit scores and writes them to files.
+    Heavy modules are imported only by stages which need them.
+    `progress` - called with percent of done stages.
+    `output_formats` - formats of output files, see `sinks.create_sink`.
+    `yields_to_maturity` - also solve yields by real coupon schedules of selected bonds, see `ytm`.
+    `ratings_file` - CSV file of credit scores looked up first, see `ratings.CsvRatingProvider`.
+    `ratings_listing` - look credit scores up in smartLab bonds listing before bond pages.
+    `parse_workers` - processes parsing smartLab bond pages, 0 to parse in downloading threads.
+    `history` - append selected bonds to `history.HistoryStore`.
+    Returns metrics of the run, which are also saved as JSON report next to the first output file.
+    """
+    return run_profiles(
+        {"": criteria},
+        file_name,
+        progress=progress,
+        profile=profile,
+        output_formats=output_formats,
+        yields_to_maturity=yields_to_maturity,
+        ratings_file=ratings_file,
+        ratings_listing=ratings_listing,
+        parse_workers=parse_workers,
+        history=history,
+    )
+
+
+def run_profiles(
+    profiles: dict[str, SearchCriteria],
+    file_name: str | None = None,
+    progress: Callable[[float], None] | None = None,
+    profile: bool = False,
+    output_formats: Iterable[str] = ("xlsx",),
+    yields_to_maturity: bool = False,
+    ratings_file: str | None = None,
+    ratings_listing: bool = True,
+    parse_workers: int = 0,
+    history: bool = True,
+) -> RunMetrics:
+    """
+    Runs several criteria profiles by one pass: bonds are fetched once,
+    bonds matching any profile share `Bond` objects, so credit scores and schedules
+    are requested once for the union of selected bonds.
+    Output files of profile are named `file_name` followed by profile name,
+    current date by default, see `profiles` for saved profiles.
+    See `run` for other arguments.
+    """
+    if not profiles:
+        raise ValueError("Не задано ни одного профиля.")
+    step = 0
+    total_steps = 5 if yields_to_maturity else 4
+    progress = progress or (lambda percent: None)
+    logger.info(f"Начало работы")
+    metrics = RunMetrics(profile=profile)
+
+    with metrics.profile():
+        from moex import MOEX_API
+        from table import BondTable
+        from snapshot import SnapshotStore
+
+        moex_api = MOEX_API(metrics=metrics)
+        progress(step / total_steps * 100)
+        step += 1
+
+        with metrics.stage("moex"):
+            table = BondTable.concat(
+                [table for table, _ in moex_api.iter_bond_tables(SnapshotStore())]
+            ).drop_duplicates()
+        progress(step / total_steps * 100)
+        step += 1
+
+        import numpy as np
+
+        with metrics.stage("filter"):
+            masks = {name: table.mask(criteria) for name, criteria in profiles.items()}
+            matched = np.logical_or.reduce(list(masks.values()))
+            matched_bonds = list(table.take(matched).iter_bonds())
+            candidates = {}
+            for name, mask in masks.items():
+                candidates[name] = [
+                    matched_bonds[i] for i in np.flatnonzero(mask[matched])
+                ]
+                logger.info(
+                    f"Проверку критериев{f' профиля {name}' if name else ''} прошли "
+                    f"{len(candidates[name])} из {len(table)} облигаций."
+                )
+        progress(step / total_steps * 100)
+        step += 1
+
+        import utils
+        from cache import CreditScoreCache
+
+        providers = _rating_providers(ratings_file, ratings_listing, metrics)
+
+        with metrics.stage("credit_scores"), CreditScoreCache() as cache, utils.SmartLabClient(
+            parse_workers=parse_workers
+        ) as client:
+            selected = {
+                name: utils.select_top_bonds(
+                    candidates[name],
+                    criteria,
+                    cache,
+                    metrics=metrics,
+                    providers=providers,
+                    client=client,
+                )
+                for name, criteria in profiles.items()
+            }
+            metrics.count("cache_hits", cache.hits)
+            metrics.count("cache_misses", cache.misses)
+        progress(step / total_steps * 100)
+        step += 1
+
+        bonds = list(
+            {id(bond): bond for bonds in selected.values() for bond in bonds}.values()
+        )
+        if yields_to_maturity:
+            import ytm
+            from cache import ScheduleCache
+
+            with metrics.stage("ytm"), ScheduleCache() as schedule_cache:
+                schedules = moex_api.get_schedules(
+                    [bond.ISIN for bond in bonds], schedule_cache
+                )
+                ytm.with_yields_to_maturity(bonds, schedules)
+                metrics.count("schedule_cache_hits", schedule_cache.hits)
+                metrics.count("schedule_cache_misses", schedule_cache.misses)
+            progress(step / total_steps * 100)
+            step += 1
+
+        from sinks import create_sink
+
+        output_files = []
+        for name, profile_bonds in selected.items():
+            for output_format in output_formats:
+                sink = create_sink(
+                    output_format, _profile_file_name(file_name, name)
+                )
+                with metrics.stage(output_format):
+                    sink.write_bonds(profile_bonds)
+                output_files.append(sink.file_name)
+        progress(step / total_steps * 100)
+
+        if history:
+            with metrics.stage("history"):
+                _append_history(bonds)
+
+    metrics.save(os.path.splitext(output_files[0])[0] + ".json")
+    logger.info(f"Конец работы")
+    return metrics
+
+
+def watch(
+    criteria: SearchCriteria,
+    interval: float = 60,
+    file_name: str | None = None,
+    output_formats: Iterable[str] = ("xlsx",),
+    ratings_file: str | None = None,
+    ratings_listing: bool = True,
+    stop: threading.Event | None = None,
+    history: bool = True,
+) -> None:
+    """
+    Keeps bonds in memory, refreshes them every `interval` seconds and rewrites output files
+    only when ranking of bonds changes, until stop is set.
+    `history` - append bonds to `history.HistoryStore` whenever output files are rewritten.
+    See `run` for other arguments.
+    """
+    from watch import Watcher
+    from sinks import create_sink
+    from cache import CreditScoreCache
+
+    def write_bonds(bonds: list[Bond]) -> None:
+        for output_format in output_formats:
+            create_sink(output_format, file_name).write_bonds(bonds)
+        if history:
+            _append_history(bonds)
+
+    with CreditScoreCache() as cache:
+        Watcher(
+            criteria,
+            interval,
+            on_update=write_bonds,
+            cache=cache,
+            providers=_rating_providers(ratings_file, ratings_listing),
+        ).run(stop)
+
+
+def load_index(
+    progress: Callable[[float], None] | None = None,
+    metrics: RunMetrics | None = None,
+    moex_api=None,
+    store=None,
+    providers: list | None = None,
+    stop: threading.Event | None = None,
+    on_batch: Callable[[list[Bond]], None] | None = None,
+    batch_interval: float = 1,
+    history: bool = True,
+    criteria: SearchCriteria | None = None,
+):
+    """
+    Fetches all bonds with credit scores and returns `index.BondIndex` of them for local queries.
+    Matured bonds and bonds with non-positive yield are dropped before credit scores are requested.
+    `criteria` - if given, only bonds matching criteria are indexed, and if `criteria.top_n` is set,
+    credit scores are requested by yield descending only until `top_n` bonds match credit score criteria.
+    `progress` - called with percent of bonds with credit scores.
+    `moex_api`, `store` - reused between calls by long-running callers, new ones by default.
+    `providers` - credit score providers, smartLab listing by default.
+    `stop` - if set, requests which aren't sent yet are cancelled
+    and partial index of bonds with credit scores received so far is returned.
+    `on_batch` - called with bonds which got credit scores, at most every `batch_interval` seconds,
+    so callers can show partial results while loading.
+    `history` - append bonds with credit scores to `history.HistoryStore`.
+    """
+    import utils
+    from moex import MOEX_API
+    from index import BondIndex
+    from network import Cancelled
+    from snapshot import SnapshotStore
+    from cache import CreditScoreCache
+
+    progress = progress or (lambda percent: None)
+    on_batch = on_batch or (lambda bonds: None)
+    metrics = metrics or RunMetrics()
+    moex_api = moex_api or MOEX_API(metrics=metrics)
+    if providers is None:
+        providers = _rating_providers(metrics=metrics, stop=stop)
+
+    with metrics.stage("moex"):
+        table, _ = moex_api.sync_bond_table(store or SnapshotStore())
+    progress(0)
+
+    # Matured bonds and bonds without positive yield aren't worth buying, so they aren't enriched
+    with metrics.stage("filter"):
+        table = table.take((table.days_to_maturity > 0) & (table.approximate_yield > 0))
+        if criteria is not None:
+            table = table.filter(criteria).sorted_by_yield()
+    logger.info(f"Облигаций в обращении с положительной доходностью: {len(table)}.")
+
+    top_n = criteria.top_n if criteria is not None else None
+    min_rank = utils.credit_score_rank(criteria.min_credit_score) if criteria else None
+    matched = 0
+    bonds = []
+    batch = []
+    batch_sent = time.monotonic()
+    partial = False
+    with metrics.stage("credit_scores"), CreditScoreCache() as cache:
+        scores = utils.iter_credit_scores(
+            table.iter_bonds(),
+            cache,
+            metrics=metrics,
+            providers=providers,
+            stop=stop,
+        )
+        try:
+            # Closing drops requests of bonds which aren't needed after `top_n` are found
+            with contextlib.closing(scores):
+                for bond in scores:
+                    bonds.append(bond)
+                    batch.append(bond)
+                    progress(len(bonds) / len(table) * 100)
+                    if time.monotonic() - batch_sent >= batch_interval:
+                        on_batch(batch)
+                        batch = []
+                        batch_sent = time.monotonic()
+                    rank = utils.credit_score_rank(bond.credit_score)
+                    if min_rank is None or (rank is not None and rank <= min_rank):
+                        matched += 1
+                    if top_n and matched >= top_n:
+                        progress(100)
+                        break
+        except Cancelled:
+            partial = True
+            logger.warning(
+                f"Загрузка прервана, получены рейтинги {len(bonds)} из {len(table)} облигаций."
+            )
+    if batch:
+        on_batch(batch)
+    if history:
+        with metrics.stage("history"):
+            _append_history(bonds)
+    return BondIndex(bonds, partial=partial)
+
+
+def serve(
+    port: int = 8080,
+    host: str = "127.0.0.1",
+    interval: float | None = None,
+    ratings_file: str | None = None,
+    ratings_listing: bool = True,
+    stop: threading.Event | None = None,
+    history: bool = True,
+) -> None:
+    """
+    Indexes all bonds with credit scores in memory and answers queries by local HTTP/JSON service,
+    see `service.BondService`, until stop is set.
+    `interval` - seconds between index refreshes, index is built once if None.
+    See `run` for other arguments.
+    """
+    from moex import MOEX_API
+    from service import BondService
+    from snapshot import SnapshotStore
+
+    moex_api = MOEX_API()
+    store = SnapshotStore()
+    stop = stop or threading.Event()
+    providers = _rating_providers(ratings_file, ratings_listing, stop=stop)
+
+    def build_index():
+        return load_index(
+            moex_api=moex_api,
+            store=store,
+            providers=providers,
+            stop=stop,
+            history=history,
+        )
+
+    with BondService(build_index(), host, port) as service:
+        while not stop.wait(interval):
+            index = build_index()
+            # Index of cancelled refresh would replace complete one with part of bonds
+            if not index.partial:
+                service.update(index)
+
+
+def _rating_providers(
+    ratings_file: str | None = None,
+    ratings_listing: bool = True,
+    metrics: RunMetrics | None = None,
+    stop: threading.Event | None = None,
+) -> list:
+    import ratings
+
+    providers = []
+    if ratings_file:
+        providers.append(ratings.CsvRatingProvider(ratings_file))
+    if ratings_listing:
+        providers.append(ratings.SmartLabListingProvider(metrics=metrics, stop=stop))
+    return providers
+
+
+def _profile_file_name(file_name: str | None, profile_name: str) -> str | None:
+    """
+    Returns output file name of profile, `file_name` itself for unnamed profile.
+    """
+    if not profile_name:
+        return file_name
+    return f"{file_name or datetime.datetime.now().strftime('%d.%m.%Y')} {profile_name}"
+
+
+def _append_history(bonds: list[Bond]) -> None:
+    """
+    Appends bonds to `history.HistoryStore`.
+    History is secondary to outputs, so failure to store it is only logged.
+    """
+    from history import HistoryStore
+
+    try:
+        HistoryStore().append(bonds)
+    except OSError as e:
+        logger.warning(f"Не удалось сохранить историю: {e}.")
@@ -0,0 +1,52 @@
+import os
+import json
+import logging
+import dataclasses
+
+from schemas import SearchCriteria
+
+logger = logging.getLogger("Profiles")
+
+PROFILES_FILE = "profiles.json"
+
+
+def load_profiles(file_name: str = PROFILES_FILE) -> dict[str, SearchCriteria]:
+    """
+    Returns saved criteria profiles by name.
+    File is JSON object of profiles, each profile is object of `SearchCriteria` fields,
+    missing fields have default values, unknown fields are ignored with warning.
+    If file doesn't exist - returns no profiles.
+    """
+    if not os.path.exists(file_name):
+        logger.warning(f"Файл профилей {file_name} не найден.")
+        return {}
+    with open(file_name, encoding="utf-8") as f:
+        data = json.load(f)
+    known_fields = {field.name for field in dataclasses.fields(SearchCriteria)}
+    profiles = {}
+    for name, fields in data.items():
+        for field in fields.keys() - known_fields:
+            logger.warning(f"Профиль {name}: неизвестный параметр {field} пропущен.")
+        profiles[name] = SearchCriteria(
+            **{field: value for field, value in fields.items() if field in known_fields}
+        )
+    logger.info(f"Загружено {len(profiles)} профилей из {file_name}.")
+    return profiles
+
+
+def save_profile(
+    name: str, criteria: SearchCriteria, file_name: str = PROFILES_FILE
+) -> None:
+    """
+    Adds profile to file or replaces saved profile with the same name.
+    """
+    profiles = load_profiles(file_name) if os.path.exists(file_name) else {}
+    profiles[name] = criteria
+    with open(file_name, "w", encoding="utf-8") as f:
+        json.dump(
+            {name: dataclasses.asdict(criteria) for name, criteria in profiles.items()},
+            f,
+            ensure_ascii=False,
+            indent=4,
+        )
+    logger.info(f"Профиль {name} сохранен в {file_name}.")
@@ -0,0 +1,172 @@
+import re
+import csv
+import time
+import logging
+import threading
+from typing import Iterable
+import requests
+from lxml import html
+
+from network import TokenBucket, create_session
+from metrics import RunMetrics
+
+logger = logging.getLogger("Ratings")
+
+SMARTLAB_LISTING_URL = "https://smart-lab.ru/q/bonds/page{}/"
+SMARTLAB_LISTING_MAX_PAGES = 100
+SMARTLAB_LISTING_RATE = 2  # requests per second
+SMARTLAB_LISTING_TIMEOUT = 30
+SMARTLAB_RATING_HEADER = "Рейтинг"
+UNKNOWN_SCORE = "Неизвестно"
+
+ISIN_LINK_PATTERN = re.compile(r"/q/bonds/([A-Z0-9]{12})")
+
+
+class RatingProvider:
+    def get_ratings(self, ISINs: Iterable[str]) -> dict[str, str]:
+        """
+        Returns credit scores of given ISINs known to provider.
+        ISINs unknown to provider are omitted, so they can be looked up elsewhere.
+        """
+        raise NotImplementedError
+
+
+class BulkRatingProvider(RatingProvider):
+    def __init__(self):
+        """
+        Inits BulkRatingProvider - provider which loads all its credit scores at once.
+        Scores are loaded on the first lookup and reused by all next ones.
+        """
+        self._ratings: dict[str, str] | None = None
+        self._lock = threading.Lock()
+
+    def get_ratings(self, ISINs: Iterable[str]) -> dict[str, str]:
+        with self._lock:
+            if self._ratings is None:
+                self._ratings = self._load()
+                logger.info(
+                    f"{type(self).__name__}: загружено {len(self._ratings)} кредитных рейтингов."
+                )
+        return {ISIN: self._ratings[ISIN] for ISIN in ISINs if ISIN in self._ratings}
+
+    def _load(self) -> dict[str, str]:
+        """
+        Returns all credit scores known to provider.
+        Format of dictionary: ISIN -> credit score
+        """
+        raise NotImplementedError
+
+
+class CsvRatingProvider(BulkRatingProvider):
+    def __init__(
+        self,
+        file_name: str,
+        ISIN_column: str = "ISIN",
+        score_column: str = "credit_score",
+    ):
+        """
+        Inits CsvRatingProvider - credit scores from local CSV file.
+        Default columns match files written by `sinks.CsvSink`.
+        """
+        super().__init__()
+        self.file_name = file_name
+        self.ISIN_column = ISIN_column
+        self.score_column = score_column
+
+    def _load(self) -> dict[str, str]:
+        ratings = {}
+        with open(self.file_name, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                ISIN = row.get(self.ISIN_column)
+                score = (row.get(self.score_column) or "").strip()
+                if ISIN and score:
+                    ratings[ISIN] = score
+        return ratings
+
+
+class SmartLabListingProvider(BulkRatingProvider):
+    def __init__(
+        self,
+        max_pages: int = SMARTLAB_LISTING_MAX_PAGES,
+        metrics: RunMetrics | None = None,
+        stop: threading.Event | None = None,
+    ):
+        """
+        Inits SmartLabListingProvider - credit scores from paginated smartLab bonds listing.
+        Every listing page covers hundreds of bonds, so requests grow with pages instead of bonds.
+        Bonds listed without credit score get unknown score.
+        `max_pages` - maximum amount of requested listing pages.
+        `metrics` - if given, all requests are recorded to it.
+        `stop` - if set, loading is interrupted by `network.Cancelled` before the next page.
+        """
+        super().__init__()
+        self.max_pages = max_pages
+        self.metrics = metrics
+        self.stop = stop
+
+    def _load(self) -> dict[str, str]:
+        """
+        Requests listing pages one by one until page without new bonds.
+        """
+        ratings = {}
+        limiter = TokenBucket(SMARTLAB_LISTING_RATE)
+        with create_session(pool_size=1) as session:
+            for page in range(1, self.max_pages + 1):
+                try:
+                    page_ratings = self._get_page_ratings(page, session, limiter)
+                except requests.RequestException as e:
+                    logger.warning(f"Не удалось получить страницу {page} списка облигаций: {e}.")
+                    break
+                new_ratings = page_ratings.keys() - ratings.keys()
+                if not new_ratings:
+                    break
+                ratings.update(page_ratings)
+        return ratings
+
+    def _get_page_ratings(
+        self, page: int, session: requests.Session, limiter: TokenBucket
+    ) -> dict[str, str]:
+        wait_time = limiter.acquire(self.stop)
+        url = SMARTLAB_LISTING_URL.format(page)
+        logger.info(f"Получение страницы {page} списка облигаций.")
+        start = time.perf_counter()
+        response = None
+        try:
+            response = session.get(url, timeout=SMARTLAB_LISTING_TIMEOUT)
+            response.raise_for_status()
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_request(url, start, response, wait_time)
+        return self._parse_listing(response.content)
+
+    @staticmethod
+    def _parse_listing(content: bytes) -> dict[str, str]:
+        """
+        Returns credit scores from tables of listing page in one pass.
+        Rows are matched to bonds by links to bond pages,
+        credit scores are taken from column with `SMARTLAB_RATING_HEADER` header.
+        """
+        ratings = {}
+        document = html.fromstring(content)
+        for table in document.iter("table"):
+            headers = [cell.text_content().strip() for cell in table.iter("th")]
+            try:
+                column = next(
+                    i
+                    for i, header in enumerate(headers)
+                    if header.startswith(SMARTLAB_RATING_HEADER)
+                )
+            except StopIteration:
+                continue
+
+            for row in table.iter("tr"):
+                cells = row.findall("td")
+                if len(cells) <= column:
+                    continue
+                for link in row.iter("a"):
+                    match = ISIN_LINK_PATTERN.search(link.get("href", ""))
+                    if match:
+                        score = cells[column].text_content().strip()
+                        ratings[match.group(1)] = score or UNKNOWN_SCORE
+                        break
+        return ratings
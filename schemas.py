@@ -1,5 +1,16 @@
 ﻿from dataclasses import dataclass
 import datetime
+import functools
+
+INCOME_TAX = 0.13
+
+
+def pre_tax_yield(after_tax_yield: float) -> float:
+    """
+    Returns yield before income tax which gives specified yield after tax.
+    Users set yields after tax, bonds are compared by yield before tax.
+    """
+    return after_tax_yield / (1 - INCOME_TAX)
 
 
 @dataclass
@@ -9,11 +20,30 @@ class SearchCriteria:
     min_days_to_maturity: float = 1
     max_days_to_maturity: float = float("inf")
     face_units: list[str] | None = ("SUR",)  # Use None if don't care about face unit
+    top_n: int | None = None  # Use None to get all bonds
+    min_credit_score: str | None = None  # Use None if don't care about credit score
 
 
 class Bond:
     BROKER_FEE = 0.25 / 100
 
+    __slots__ = (
+        "ISIN",
+        "bond_name",
+        "face_value",
+        "coupon_value",
+        "coupon_period",
+        "maturity_date",
+        "bond_price",
+        "ACI",
+        "face_unit",
+        "credit_score",
+        "is_qualified",
+        "yield_to_maturity",
+        "as_of",
+        "_derived",
+    )
+
     def __init__(
         self,
         ISIN: str,
@@ -27,7 +57,14 @@ class Bond:
         face_unit: str,
         credit_score: str | None = None,
         is_qualified: bool | None = None,
+        yield_to_maturity: float | None = None,
+        as_of: datetime.date | None = None,
     ):
+        """
+        Inits Bond.
+        `yield_to_maturity` - annual effective yield by real cash flows schedule, see `ytm`.
+        `as_of` - valuation date of derived values, today by default.
+        """
         self.ISIN: str = ISIN
         self.bond_name: str = name
         self.face_value: float = face_value or 0
@@ -39,19 +76,23 @@ class Bond:
         self.face_unit: str = face_unit
         self.credit_score: str = credit_score
         self.is_qualified: bool = is_qualified
+        self.yield_to_maturity: float | None = yield_to_maturity
+        self.as_of: datetime.date = as_of or datetime.date.today()
+        self._derived: tuple | None = None
 
     @classmethod
-    def from_list(cls, data: list):
+    def from_list(cls, data: list, as_of: datetime.date | None = None):
         return cls(
             ISIN=data[0],
             name=data[1],
             face_value=float(data[2]),
             coupon_value=float(data[3]),
             coupon_period=float(data[4]),
-            maturity_date=datetime.datetime.strptime(data[5], "%Y-%m-%d").date(),
+            maturity_date=parse_date(data[5]),
             price=float(data[6]),
             ACI=float(data[7]),
             face_unit=data[8],
+            as_of=as_of,
         )
 
     @classmethod
@@ -65,10 +106,48 @@ class Bond:
             "Номинал купона",
             "Дней до погашения",
             "Доходность к погашению",
+            "Эффективная доходность к погашению",
             "Валюта",
             "Требуется квалификация",
         ]
 
+    @classmethod
+    def record_fields(cls) -> list[str]:
+        return [
+            "name",
+            "credit_score",
+            "ISIN",
+            "face_value",
+            "broker_price",
+            "coupon_value",
+            "maturity_date",
+            "days_to_maturity",
+            "approximate_yield",
+            "yield_to_maturity",
+            "face_unit",
+            "is_qualified",
+        ]
+
+    @property
+    def as_record(self) -> dict:
+        """
+        Returns typed values of bond by `Bond.record_fields`, unknown values are None.
+        """
+        return {
+            "name": self.bond_name,
+            "credit_score": self.credit_score,
+            "ISIN": self.ISIN,
+            "face_value": self.face_value,
+            "broker_price": self.broker_price,
+            "coupon_value": self.coupon_value,
+            "maturity_date": self.maturity_date,
+            "days_to_maturity": self.days_to_maturity,
+            "approximate_yield": self.approximate_yield,
+            "yield_to_maturity": self.yield_to_maturity,
+            "face_unit": self.face_unit,
+            "is_qualified": self.is_qualified,
+        }
+
     @property
     def as_list(self):
         return [
@@ -80,6 +159,7 @@ class Bond:
             self.coupon_value,
             self.days_to_maturity,
             self.approximate_yield,
+            self.yield_to_maturity,
             self.face_unit,
             (
                 "Неизвестно"
@@ -89,35 +169,59 @@ class Bond:
         ]
 
     @property
-    def broker_price(self):
-        price = self.face_value * self.bond_price / 100  # no ACI
-        price = price + self.ACI  # current market price
-        price *= 1 + self.BROKER_FEE  # including broker fee
-        return price
+    def broker_price(self) -> float:
+        return self._derive()[0]
 
     @property
-    def coupons_amount(self):
-        if not self.coupon_period:
-            return 0
-
-        full_coupons, part_coupon = divmod(self.days_to_maturity, self.coupon_period)
-        coupons = full_coupons + bool(part_coupon)
-        return coupons
+    def coupons_amount(self) -> int:
+        return self._derive()[1]
 
     @property
-    def days_to_maturity(self):
-        return (self.maturity_date - datetime.date.today()).days
+    def days_to_maturity(self) -> int:
+        return self._derive()[2]
 
     @property
-    def approximate_yield(self):
-        if self.days_to_maturity <= 0:
-            return 0
+    def approximate_yield(self) -> float:
+        return self._derive()[3]
 
-        coupons_income = self.coupons_amount * self.coupon_value
+    def _derive(self) -> tuple:
+        """
+        Returns derived values (broker price, coupons amount, days to maturity, yield).
+        Values are computed once per valuation date `self.as_of`.
+        """
+        if self._derived is not None and self._derived[0] == self.as_of:
+            return self._derived[1]
 
-        total_income = self.face_value + coupons_income
-        rate = (
-            (total_income / self.broker_price - 1) * 100 * 365 / self.days_to_maturity
-        )
+        price = self.face_value * self.bond_price / 100  # no ACI
+        price = price + self.ACI  # current market price
+        price *= 1 + self.BROKER_FEE  # including broker fee
 
-        return round(rate, 2)
+        days_to_maturity = (self.maturity_date - self.as_of).days
+
+        if not self.coupon_period:
+            coupons = 0
+        else:
+            full_coupons, part_coupon = divmod(days_to_maturity, self.coupon_period)
+            coupons = full_coupons + bool(part_coupon)
+
+        if days_to_maturity <= 0 or price <= 0:
+            rate = 0
+        else:
+            coupons_income = coupons * self.coupon_value
+            total_income = self.face_value + coupons_income
+            rate = round(
+                (total_income / price - 1) * 100 * 365 / days_to_maturity, 2
+            )
+
+        derived = (price, coupons, days_to_maturity, rate)
+        self._derived = (self.as_of, derived)
+        return derived
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_date(value: str) -> datetime.date:
+    """
+    Returns date from ISS `%Y-%m-%d` string.
+    Results are memoized, because maturity dates of many securities repeat.
+    """
+    return datetime.datetime.strptime(value, "%Y-%m-%d").date()
@@ -0,0 +1,110 @@
+import json
+import logging
+import datetime
+import threading
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from schemas import SearchCriteria
+from index import BondIndex
+
+logger = logging.getLogger("Service")
+
+
+class BondService(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, index: BondIndex, host: str = "127.0.0.1", port: int = 8080):
+        """
+        Inits BondService - local HTTP/JSON endpoint answering queries from in-memory BondIndex.
+        GET /bonds?min_bond_yield=..&face_units=SUR,USD&top_n=..&min_credit_score=..
+            - bonds matching `SearchCriteria` fields given as query parameters.
+        GET /status - amount of indexed bonds and time of the last update.
+        Index can be replaced by `update` while service is running.
+        """
+        super().__init__((host, port), _Handler)
+        self.index = index
+        self.updated = datetime.datetime.now()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Сервис запущен: {self.url}.")
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+        logger.info(f"Сервис остановлен.")
+
+    def update(self, index: BondIndex) -> None:
+        self.index = index
+        self.updated = datetime.datetime.now()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: BondService
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/bonds":
+            try:
+                criteria = self._criteria(parse_qs(url.query))
+            except (TypeError, ValueError) as e:
+                self._respond(400, {"error": str(e)})
+                return
+            bonds = self.server.index.query(criteria)
+            self._respond(200, [bond.as_record for bond in bonds])
+        elif url.path == "/status":
+            self._respond(
+                200,
+                {"bonds": len(self.server.index), "updated": self.server.updated},
+            )
+        else:
+            self._respond(404, {"error": "not found"})
+
+    @staticmethod
+    def _criteria(query: dict[str, list[str]]) -> SearchCriteria:
+        """
+        Returns SearchCriteria from query parameters, missing parameters have default values.
+        Empty `face_units` means any face unit.
+        """
+        values = {}
+        for name in (
+            "min_bond_yield",
+            "max_bond_yield",
+            "min_days_to_maturity",
+            "max_days_to_maturity",
+        ):
+            if name in query:
+                values[name] = float(query[name][0])
+        if "face_units" in query:
+            face_units = query["face_units"][0]
+            values["face_units"] = face_units.split(",") if face_units else None
+        if "top_n" in query:
+            values["top_n"] = int(query["top_n"][0])
+        if "min_credit_score" in query:
+            values["min_credit_score"] = query["min_credit_score"][0]
+        return SearchCriteria(**values)
+
+    def _respond(self, status: int, data) -> None:
+        body = json.dumps(data, ensure_ascii=False, default=_json_default).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,133 @@
+import csv
+import datetime
+import logging
+from typing import Iterable
+
+from schemas import Bond
+
+logger = logging.getLogger("Sinks")
+
+
+class BondSink:
+    EXTENSION = ""
+
+    def __init__(self, file_name: str = None):
+        """
+        Inits BondSink - output of bonds to file.
+        """
+        self.file_name = self._normalize_file_name(file_name)
+
+    def write_bonds(self, bond_list: Iterable[Bond]) -> None:
+        """
+        Writes given bond_list to file.
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def _normalize_file_name(cls, file_name: str | None) -> str:
+        """
+        Normalizes given file name.
+        If no file name given - sets default file name to current date `%d.%m.%Y`.
+        """
+        if file_name is None:
+            file_name = datetime.datetime.now().strftime("%d.%m.%Y")
+        if not file_name.endswith(cls.EXTENSION):
+            file_name += cls.EXTENSION
+        return file_name
+
+
+class CsvSink(BondSink):
+    EXTENSION = ".csv"
+
+    def write_bonds(self, bond_list: Iterable[Bond]) -> None:
+        """
+        Writes given bond_list to CSV file row by row.
+        Dates are written in ISO format, unknown values as empty cells.
+        """
+        with open(self.file_name, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=Bond.record_fields())
+            writer.writeheader()
+            for bond in bond_list:
+                writer.writerow(bond.as_record)
+        logger.info(f"Файл сохранен: {self.file_name}.")
+
+
+class ArrowSink(BondSink):
+    EXTENSION = ".arrow"
+
+    def __init__(self, file_name: str = None, batch_size: int = 10_000):
+        """
+        Inits ArrowSink - output of bonds to Arrow IPC file with typed columns.
+        `batch_size` - amount of bonds kept in memory before writing.
+        """
+        super().__init__(file_name)
+        self.batch_size = batch_size
+
+    def write_bonds(self, bond_list: Iterable[Bond]) -> None:
+        """
+        Writes given bond_list to file in batches of `self.batch_size` bonds.
+        """
+        import pyarrow as pa
+
+        schema = self._schema()
+        with self._writer(schema) as writer:
+            batch = []
+            for bond in bond_list:
+                batch.append(bond.as_record)
+                if len(batch) >= self.batch_size:
+                    writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                    batch = []
+            if batch:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+        logger.info(f"Файл сохранен: {self.file_name}.")
+
+    @staticmethod
+    def _schema():
+        import pyarrow as pa
+
+        return pa.schema(
+            [
+                ("name", pa.string()),
+                ("credit_score", pa.string()),
+                ("ISIN", pa.string()),
+                ("face_value", pa.float64()),
+                ("broker_price", pa.float64()),
+                ("coupon_value", pa.float64()),
+                ("maturity_date", pa.date32()),
+                ("days_to_maturity", pa.int64()),
+                ("approximate_yield", pa.float64()),
+                ("yield_to_maturity", pa.float64()),
+                ("face_unit", pa.string()),
+                ("is_qualified", pa.bool_()),
+            ]
+        )
+
+    def _writer(self, schema):
+        import pyarrow as pa
+
+        return pa.ipc.new_file(self.file_name, schema)
+
+
+class ParquetSink(ArrowSink):
+    EXTENSION = ".parquet"
+
+    def _writer(self, schema):
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(self.file_name, schema)
+
+
+def create_sink(output_format: str, file_name: str = None) -> BondSink:
+    """
+    Returns sink for output format: `xlsx`, `csv`, `arrow` or `parquet`.
+    """
+    if output_format == "xlsx":
+        from excel import ExcelBook
+
+        return ExcelBook(file_name, write_only=True)
+
+    sinks = {"csv": CsvSink, "arrow": ArrowSink, "parquet": ParquetSink}
+    try:
+        return sinks[output_format](file_name)
+    except KeyError:
+        raise ValueError(f"Неизвестный формат вывода: {output_format}.")
@@ -0,0 +1,153 @@
+import os
+import pickle
+import datetime
+import logging
+import numpy as np
+from dataclasses import dataclass, field
+
+from table import BondTable
+
+logger = logging.getLogger("Snapshot")
+
+
+@dataclass
+class SecuritiesDelta:
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def extend(self, other: "SecuritiesDelta") -> None:
+        self.added.extend(other.added)
+        self.removed.extend(other.removed)
+        self.changed.extend(other.changed)
+
+
+@dataclass
+class Snapshot:
+    securities: dict = field(default_factory=dict)  # SECID -> security_data
+    table: BondTable | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    # SECID -> reason of securities missing from table, None for snapshots stored before
+    rejected: dict | None = None
+
+    @property
+    def conditional_headers(self) -> dict:
+        """
+        Returns headers for conditional request of changes since this snapshot.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class SnapshotStore:
+    def __init__(self, directory: str = "snapshots"):
+        """
+        Inits SnapshotStore - storage of last fetched securities per boardgroup.
+        Loaded snapshots are kept in memory, so long-running processes read files only once.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+        self._snapshots: dict[str, Snapshot] = {}
+
+    def load(self, boardgroup: str) -> Snapshot:
+        """
+        Returns last stored snapshot of boardgroup or empty snapshot if there is none.
+        """
+        if boardgroup in self._snapshots:
+            return self._snapshots[boardgroup]
+        try:
+            with open(self._path(boardgroup), "rb") as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return Snapshot()
+        except (pickle.UnpicklingError, EOFError, AttributeError):
+            logger.warning(f"Не удалось прочитать снимок группы {boardgroup}.")
+            return Snapshot()
+        self._snapshots[boardgroup] = snapshot
+        return snapshot
+
+    def save(self, boardgroup: str, snapshot: Snapshot) -> None:
+        """
+        Stores snapshot of boardgroup.
+        """
+        path = self._path(boardgroup)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(snapshot, f)
+        os.replace(path + ".tmp", path)
+        self._snapshots[boardgroup] = snapshot
+
+    def update(
+        self,
+        boardgroup: str,
+        securities: dict,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> tuple[Snapshot, SecuritiesDelta]:
+        """
+        Stores new securities of boardgroup and returns new snapshot with changes since last one.
+        Only added and changed securities are parsed, unchanged ones are taken from last snapshot,
+        as well as reasons of unchanged rejected securities.
+        If nothing changed since last snapshot of today - it is returned without storing again.
+        """
+        old = self.load(boardgroup)
+        delta = self.diff(old.securities, securities)
+
+        if (
+            delta.is_empty
+            and old.table is not None
+            and old.table.as_of == datetime.date.today()
+            and (old.etag, old.last_modified) == (etag, last_modified)
+        ):
+            return old, delta
+
+        if old.table is None:
+            table, rejected = BondTable.ingest(securities.values())
+        elif delta.is_empty:
+            table = old.table.with_as_of()
+            rejected = old.rejected or {}
+        else:
+            parsed, rejected = BondTable.ingest(
+                securities[SECID] for SECID in delta.added + delta.changed
+            )
+            outdated = delta.removed + delta.changed
+            unchanged = old.table.take(~np.isin(old.table.ISIN, outdated))
+            table = BondTable.concat([unchanged.with_as_of(), parsed])
+            outdated = set(outdated)
+            rejected = {
+                **{
+                    SECID: reason
+                    for SECID, reason in (old.rejected or {}).items()
+                    if SECID not in outdated
+                },
+                **rejected,
+            }
+
+        snapshot = Snapshot(securities, table, etag, last_modified, rejected)
+        self.save(boardgroup, snapshot)
+        return snapshot, delta
+
+    @staticmethod
+    def diff(old: dict, new: dict) -> SecuritiesDelta:
+        """
+        Returns SECIDs added, removed and changed between two dictionaries of securities.
+        """
+        return SecuritiesDelta(
+            added=[SECID for SECID in new if SECID not in old],
+            removed=[SECID for SECID in old if SECID not in new],
+            changed=[
+                SECID for SECID in new if SECID in old and new[SECID] != old[SECID]
+            ],
+        )
+
+    def _path(self, boardgroup: str) -> str:
+        return os.path.join(self.directory, f"{boardgroup}.pickle")
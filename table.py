@@ -0,0 +1,283 @@
+import datetime
+import logging
+import collections
+import numpy as np
+
+from schemas import Bond, SearchCriteria, parse_date
+from logs import StageSummary
+
+logger = logging.getLogger("Table")
+
+
+class BondTable:
+    COLUMNS = (
+        "ISIN",
+        "name",
+        "face_value",
+        "coupon_value",
+        "coupon_period",
+        "maturity_date",
+        "price",
+        "ACI",
+        "face_unit",
+    )
+
+    def __init__(
+        self,
+        ISIN: np.ndarray,
+        name: np.ndarray,
+        face_value: np.ndarray,
+        coupon_value: np.ndarray,
+        coupon_period: np.ndarray,
+        maturity_date: np.ndarray,
+        price: np.ndarray,
+        ACI: np.ndarray,
+        face_unit: np.ndarray,
+        as_of: datetime.date | None = None,
+    ):
+        """
+        Inits BondTable - columnar storage of bonds.
+        Derived values are computed for all bonds at once, `Bond` objects are created on demand.
+        `maturity_date` - array of proleptic Gregorian ordinals of maturity dates.
+        `as_of` - valuation date, today by default.
+        """
+        self.ISIN = ISIN
+        self.name = name
+        self.face_value = face_value
+        self.coupon_value = coupon_value
+        self.coupon_period = coupon_period
+        self.maturity_date = maturity_date
+        self.price = price
+        self.ACI = ACI
+        self.face_unit = face_unit
+        self.as_of = as_of or datetime.date.today()
+
+        self._approximate_yield = None
+
+    @classmethod
+    def from_rows(
+        cls, rows: list[list], as_of: datetime.date | None = None
+    ) -> "BondTable":
+        """
+        Returns table built from rows of ISS `securities` data.
+        Rows are expected in the same format as for `Bond.from_list`.
+        Rows that can't be parsed are skipped.
+        """
+        return cls.ingest(rows, as_of)[0]
+
+    @classmethod
+    def ingest(
+        cls, rows: list[list], as_of: datetime.date | None = None
+    ) -> tuple["BondTable", dict[str, str]]:
+        """
+        Returns table built from rows of ISS `securities` data and reasons of rejected rows.
+        Format of reasons: SECID -> reason, see `rejection_counts`.
+        Rows are expected in the same format as for `Bond.from_list`.
+        Columns are collected for all rows and converted to arrays at once,
+        maturity dates are parsed by memoized `parse_date`.
+        """
+        columns = [[] for _ in range(9)]
+        rejected = {}
+        summary = StageSummary(logger, "Разбор бумаг")
+        for row in rows:
+            reason = None
+            if len(row) < len(cls.COLUMNS):
+                reason = "неполные данные"
+            elif row[5] is None:
+                reason = "нет даты погашения"
+            else:
+                try:
+                    maturity_date = parse_date(row[5]).toordinal()
+                except (TypeError, ValueError):
+                    reason = "некорректная дата погашения"
+                else:
+                    try:
+                        values = (
+                            row[0],
+                            row[1],
+                            float(row[2]) or 0,
+                            float(row[3]) or 0,
+                            float(row[4]) or float("inf"),
+                            maturity_date,
+                            float(row[6]) or float("inf"),
+                            float(row[7]),
+                            row[8],
+                        )
+                    except (TypeError, ValueError):
+                        reason = "некорректные числовые данные"
+            if reason is not None:
+                rejected[row[0] if row else ""] = reason
+                summary.add(reason, row)
+                logger.debug(
+                    f"Ошибка при получении информации по облигации ({reason}). Информация по облигации: {row}."
+                )
+                continue
+            summary.add("обработано")
+            for column, value in zip(columns, values):
+                column.append(value)
+        summary.log()
+
+        table = cls(
+            ISIN=np.array(columns[0], dtype=object),
+            name=np.array(columns[1], dtype=object),
+            face_value=np.array(columns[2], dtype=np.float64),
+            coupon_value=np.array(columns[3], dtype=np.float64),
+            coupon_period=np.array(columns[4], dtype=np.float64),
+            maturity_date=np.array(columns[5], dtype=np.int64),
+            price=np.array(columns[6], dtype=np.float64),
+            ACI=np.array(columns[7], dtype=np.float64),
+            face_unit=np.array(columns[8], dtype=object),
+            as_of=as_of,
+        )
+        return table, rejected
+
+    @staticmethod
+    def rejection_counts(rejected: dict[str, str]) -> collections.Counter:
+        """
+        Returns counts of rejected rows by reason.
+        """
+        return collections.Counter(rejected.values())
+
+    @classmethod
+    def concat(cls, tables: list["BondTable"]) -> "BondTable":
+        """
+        Returns table of bonds from all given tables.
+        Valuation date is taken from the first table.
+        If all tables have the same valuation date - already computed yields are reused,
+        so yields are computed only for tables which don't have them yet.
+        """
+        columns = {
+            column: np.concatenate([getattr(table, column) for table in tables])
+            for column in cls.COLUMNS
+        }
+        result = cls(**columns, as_of=tables[0].as_of)
+        if all(table.as_of == result.as_of for table in tables):
+            result._approximate_yield = np.concatenate(
+                [table.approximate_yield for table in tables]
+            )
+        return result
+
+    def drop_duplicates(self) -> "BondTable":
+        """
+        Returns new table where every security is kept once, at its first row.
+        Tables concatenated in `MOEX_API.BOARDGROUPS` order keep security of the first boardgroup.
+        """
+        _, first = np.unique(self.ISIN.astype(str), return_index=True)
+        if len(first) == len(self):
+            return self
+        logger.info(f"Исключено {len(self) - len(first)} повторяющихся бумаг.")
+        return self.take(np.sort(first))
+
+    def __len__(self) -> int:
+        return len(self.ISIN)
+
+    @property
+    def days_to_maturity(self) -> np.ndarray:
+        return self.maturity_date - self.as_of.toordinal()
+
+    @property
+    def coupons_amount(self) -> np.ndarray:
+        full_coupons, part_coupon = np.divmod(
+            self.days_to_maturity, self.coupon_period
+        )
+        return full_coupons + (part_coupon != 0)
+
+    @property
+    def broker_price(self) -> np.ndarray:
+        with np.errstate(invalid="ignore"):
+            price = self.face_value * self.price / 100  # no ACI
+        price = price + self.ACI  # current market price
+        price *= 1 + Bond.BROKER_FEE  # including broker fee
+        return price
+
+    @property
+    def approximate_yield(self) -> np.ndarray:
+        if self._approximate_yield is None:
+            days = self.days_to_maturity
+            price = self.broker_price
+            total_income = self.face_value + self.coupons_amount * self.coupon_value
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rate = (total_income / price - 1) * 100 * 365 / days
+            # Same as `Bond.approximate_yield`: no yield for matured or free bonds
+            self._approximate_yield = np.where(
+                (days > 0) & (price > 0), np.round(rate, 2), 0
+            )
+        return self._approximate_yield
+
+    def mask(self, criteria: SearchCriteria) -> np.ndarray:
+        """
+        Returns boolean mask of bonds matching criteria.
+        """
+        days = self.days_to_maturity
+        bond_yield = self.approximate_yield
+        mask = (
+            (criteria.min_days_to_maturity <= days)
+            & (days <= criteria.max_days_to_maturity)
+            & (criteria.min_bond_yield <= bond_yield)
+            & (bond_yield <= criteria.max_bond_yield)
+        )
+        if criteria.face_units is not None:
+            mask &= np.isin(self.face_unit, list(criteria.face_units))
+        return mask
+
+    def take(self, indices: np.ndarray) -> "BondTable":
+        """
+        Returns new table of bonds selected by indices or boolean mask.
+        """
+        table = BondTable(
+            **{column: getattr(self, column)[indices] for column in self.COLUMNS},
+            as_of=self.as_of,
+        )
+        if self._approximate_yield is not None:
+            table._approximate_yield = self._approximate_yield[indices]
+        return table
+
+    def with_as_of(self, as_of: datetime.date | None = None) -> "BondTable":
+        """
+        Returns table of the same bonds valued at another date, today by default.
+        Yields are kept if valuation date is not changed.
+        """
+        table = BondTable(
+            **{column: getattr(self, column) for column in self.COLUMNS},
+            as_of=as_of,
+        )
+        if table.as_of == self.as_of:
+            table._approximate_yield = self._approximate_yield
+        return table
+
+    def filter(self, criteria: SearchCriteria) -> "BondTable":
+        """
+        Returns new table of bonds matching criteria.
+        """
+        table = self.take(self.mask(criteria))
+        logger.info(
+            f"Проверку критериев прошли {len(table)} из {len(self)} облигаций."
+        )
+        return table
+
+    def sorted_by_yield(self) -> "BondTable":
+        """
+        Returns new table sorted by approximate yield descending.
+        """
+        return self.take(np.argsort(-self.approximate_yield, kind="stable"))
+
+    def iter_bonds(self):
+        """
+        Yields `Bond` objects for every row of table.
+        """
+        for i in range(len(self)):
+            yield Bond(
+                ISIN=self.ISIN[i],
+                name=self.name[i],
+                face_value=float(self.face_value[i]),
+                coupon_value=float(self.coupon_value[i]),
+                coupon_period=float(self.coupon_period[i]),
+                maturity_date=datetime.date.fromordinal(int(self.maturity_date[i])),
+                price=float(self.price[i]),
+                ACI=float(self.ACI[i]),
+                face_unit=self.face_unit[i],
+                as_of=self.as_of,
+            )
+
+    def to_bonds(self) -> list[Bond]:
+        return list(self.iter_bonds())
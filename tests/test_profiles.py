@@ -0,0 +1,15 @@
+import json
+
+from profiles import load_profiles
+from schemas import SearchCriteria
+
+
+def test_unknown_fields_are_ignored(tmp_path):
+    file_name = tmp_path / "profiles.json"
+    file_name.write_text(
+        json.dumps({"short": {"top_n": 5, "min_bond_yeild": 20}}), encoding="utf-8"
+    )
+
+    profiles = load_profiles(str(file_name))
+
+    assert profiles == {"short": SearchCriteria(top_n=5)}
@@ -0,0 +1,43 @@
+import pytest
+
+import utils
+from benchmarks.fixtures import SCORES, Fixtures
+from utils import CREDIT_SCORE_SCALE, credit_score_rank
+
+
+@pytest.mark.parametrize(
+    "score, expected",
+    [
+        ("ruA-", "A-"),
+        ("AA+(RU)", "AA+"),
+        ("BBB-", "BBB-"),
+        ("ruAAA", "AAA"),
+        ("A+|ru|", "A+"),
+        ("Expert RA: ruA-", "A-"),
+    ],
+)
+def test_credit_score_rank(score, expected):
+    assert credit_score_rank(score) == CREDIT_SCORE_SCALE.index(expected)
+
+
+@pytest.mark.parametrize("score", [None, "", "Not rated", "Неизвестно", "Grub"])
+def test_credit_score_rank_without_score(score):
+    assert credit_score_rank(score) is None
+
+
+PAGES = [Fixtures._synthetic_page(score).encode("utf-8") for score in SCORES] + [
+    "<div>Кредитный рейтинг</div><div><b>ruAA</b>-</div>".encode("utf-8"),
+    "<div>Кредитный рейтинг</div>".encode("utf-8"),
+    b"",
+]
+
+
+@pytest.mark.parametrize("page", PAGES)
+@pytest.mark.parametrize("chunk_size", [7, utils.SMARTLAB_CHUNK_SIZE])
+def test_fast_extractor_agrees_with_BeautifulSoup(page, chunk_size):
+    chunks = [page[i : i + chunk_size] for i in range(0, len(page), chunk_size)]
+
+    fast_score = utils._extract_credit_score(chunks)
+    bs_score = utils._extract_credit_score_BS(page.decode("utf-8"))
+
+    assert fast_score == bs_score
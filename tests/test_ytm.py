@@ -0,0 +1,57 @@
+import datetime
+import numpy as np
+
+import ytm
+from schemas import Bond
+
+
+def test_par_bond_yield_equals_coupon_rate():
+    # 5 annual coupons of 10% and face value repaid with the last one
+    times = np.arange(1, 6, dtype=float)[None, :]
+    amounts = np.full((1, 5), 100.0)
+    amounts[0, -1] += 1000
+
+    yields = ytm.solve_yields(np.array([1000.0]), amounts, times)
+
+    assert abs(yields[0] - 0.1) < 1e-9
+
+
+def test_discount_and_premium_bonds():
+    times = np.tile(np.arange(1, 6, dtype=float), (2, 1))
+    amounts = np.full((2, 5), 100.0)
+    amounts[:, -1] += 1000
+
+    discount, premium = ytm.solve_yields(np.array([900.0, 1100.0]), amounts, times)
+
+    assert discount > 0.1 > premium
+
+
+def test_unsolvable_rows_are_nan():
+    times = np.array([[1.0], [1.0]])
+    amounts = np.array([[1000.0], [0.0]])
+
+    yields = ytm.solve_yields(np.array([0.0, 1000.0]), amounts, times)
+
+    assert np.isnan(yields).all()
+
+
+def test_face_value_repaid_at_maturity_without_amortizations():
+    as_of = datetime.date(2025, 1, 1)
+    bond = Bond(
+        ISIN="RU000A000001",
+        name="Облигация",
+        face_value=1000,
+        coupon_value=50,
+        coupon_period=182,
+        maturity_date=datetime.date(2026, 1, 1),
+        price=100,
+        ACI=0,
+        face_unit="SUR",
+        as_of=as_of,
+    )
+    schedule = {"coupons": [["2024-07-01", 50], ["2025-07-02", None]], "amortizations": []}
+
+    amounts, times = ytm.cash_flows([bond], {bond.ISIN: schedule})
+
+    assert amounts.tolist() == [[50, 1000]]
+    assert np.allclose(times, [[182 / 365, 1]])
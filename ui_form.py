@@ -15,30 +15,29 @@ from PySide6.QtGui import (QBrush, QColor, QConicalGradient, QCursor,
     QFont, QFontDatabase, QGradient, QIcon,
     QImage, QKeySequence, QLinearGradient, QPainter,
     QPalette, QPixmap, QRadialGradient, QTransform)
-from PySide6.QtWidgets import (QApplication, QDoubleSpinBox, QHBoxLayout, QLabel,
-    QProgressBar, QPushButton, QSizePolicy, QSpinBox,
-    QVBoxLayout, QWidget)
+from PySide6.QtWidgets import (QAbstractItemView, QApplication, QComboBox, QDoubleSpinBox,
+    QHBoxLayout, QHeaderView, QLabel, QProgressBar,
+    QPushButton, QSizePolicy, QSpacerItem, QSpinBox,
+    QTableView, QVBoxLayout, QWidget)
 
 class Ui_Widget(object):
     def setupUi(self, Widget):
         if not Widget.objectName():
             Widget.setObjectName(u"Widget")
-        Widget.resize(255, 174)
-        self.layoutWidget = QWidget(Widget)
-        self.layoutWidget.setObjectName(u"layoutWidget")
-        self.layoutWidget.setGeometry(QRect(1, 1, 252, 170))
-        self.verticalLayout_4 = QVBoxLayout(self.layoutWidget)
+        Widget.resize(900, 480)
+        self.horizontalLayout_5 = QHBoxLayout(Widget)
+        self.horizontalLayout_5.setObjectName(u"horizontalLayout_5")
+        self.verticalLayout_4 = QVBoxLayout()
         self.verticalLayout_4.setObjectName(u"verticalLayout_4")
-        self.verticalLayout_4.setContentsMargins(0, 0, 0, 0)
         self.horizontalLayout_2 = QHBoxLayout()
         self.horizontalLayout_2.setObjectName(u"horizontalLayout_2")
-        self.label = QLabel(self.layoutWidget)
+        self.label = QLabel(Widget)
         self.label.setObjectName(u"label")
         self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         self.horizontalLayout_2.addWidget(self.label)
 
-        self.minBondYieldSpinBox = QDoubleSpinBox(self.layoutWidget)
+        self.minBondYieldSpinBox = QDoubleSpinBox(Widget)
         self.minBondYieldSpinBox.setObjectName(u"minBondYieldSpinBox")
         self.minBondYieldSpinBox.setMaximum(999999999.000000000000000)
 
@@ -47,9 +46,59 @@ class Ui_Widget(object):
 
         self.verticalLayout_4.addLayout(self.horizontalLayout_2)
 
+        self.horizontalLayout_3 = QHBoxLayout()
+        self.horizontalLayout_3.setObjectName(u"horizontalLayout_3")
+        self.label_4 = QLabel(Widget)
+        self.label_4.setObjectName(u"label_4")
+        self.label_4.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        self.horizontalLayout_3.addWidget(self.label_4)
+
+        self.topBondsSpinBox = QSpinBox(Widget)
+        self.topBondsSpinBox.setObjectName(u"topBondsSpinBox")
+        self.topBondsSpinBox.setMaximum(999999999)
+
+        self.horizontalLayout_3.addWidget(self.topBondsSpinBox)
+
+
+        self.verticalLayout_4.addLayout(self.horizontalLayout_3)
+
+        self.horizontalLayout_4 = QHBoxLayout()
+        self.horizontalLayout_4.setObjectName(u"horizontalLayout_4")
+        self.label_5 = QLabel(Widget)
+        self.label_5.setObjectName(u"label_5")
+        self.label_5.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        self.horizontalLayout_4.addWidget(self.label_5)
+
+        self.minCreditScoreComboBox = QComboBox(Widget)
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.addItem("")
+        self.minCreditScoreComboBox.setObjectName(u"minCreditScoreComboBox")
+
+        self.horizontalLayout_4.addWidget(self.minCreditScoreComboBox)
+
+
+        self.verticalLayout_4.addLayout(self.horizontalLayout_4)
+
         self.verticalLayout_3 = QVBoxLayout()
         self.verticalLayout_3.setObjectName(u"verticalLayout_3")
-        self.label_1 = QLabel(self.layoutWidget)
+        self.label_1 = QLabel(Widget)
         self.label_1.setObjectName(u"label_1")
         self.label_1.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.label_1.setWordWrap(False)
@@ -60,13 +109,13 @@ class Ui_Widget(object):
         self.horizontalLayout.setObjectName(u"horizontalLayout")
         self.verticalLayout_2 = QVBoxLayout()
         self.verticalLayout_2.setObjectName(u"verticalLayout_2")
-        self.label_2 = QLabel(self.layoutWidget)
+        self.label_2 = QLabel(Widget)
         self.label_2.setObjectName(u"label_2")
         self.label_2.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         self.verticalLayout_2.addWidget(self.label_2)
 
-        self.minDaysToMaturitySpinBox = QSpinBox(self.layoutWidget)
+        self.minDaysToMaturitySpinBox = QSpinBox(Widget)
         self.minDaysToMaturitySpinBox.setObjectName(u"minDaysToMaturitySpinBox")
         self.minDaysToMaturitySpinBox.setMaximum(999999999)
 
@@ -77,13 +126,13 @@ class Ui_Widget(object):
 
         self.verticalLayout = QVBoxLayout()
         self.verticalLayout.setObjectName(u"verticalLayout")
-        self.label_3 = QLabel(self.layoutWidget)
+        self.label_3 = QLabel(Widget)
         self.label_3.setObjectName(u"label_3")
         self.label_3.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         self.verticalLayout.addWidget(self.label_3)
 
-        self.maxDaysToMaturitySpinBox = QSpinBox(self.layoutWidget)
+        self.maxDaysToMaturitySpinBox = QSpinBox(Widget)
         self.maxDaysToMaturitySpinBox.setObjectName(u"maxDaysToMaturitySpinBox")
         self.maxDaysToMaturitySpinBox.setMaximum(999999999)
 
@@ -98,17 +147,49 @@ class Ui_Widget(object):
 
         self.verticalLayout_4.addLayout(self.verticalLayout_3)
 
-        self.buttonStart = QPushButton(self.layoutWidget)
+        self.buttonStart = QPushButton(Widget)
         self.buttonStart.setObjectName(u"buttonStart")
 
         self.verticalLayout_4.addWidget(self.buttonStart)
 
-        self.progressBar = QProgressBar(self.layoutWidget)
+        self.progressBar = QProgressBar(Widget)
         self.progressBar.setObjectName(u"progressBar")
         self.progressBar.setValue(0)
 
         self.verticalLayout_4.addWidget(self.progressBar)
 
+        self.buttonRefresh = QPushButton(Widget)
+        self.buttonRefresh.setObjectName(u"buttonRefresh")
+
+        self.verticalLayout_4.addWidget(self.buttonRefresh)
+
+        self.buttonCancel = QPushButton(Widget)
+        self.buttonCancel.setObjectName(u"buttonCancel")
+        self.buttonCancel.setEnabled(False)
+
+        self.verticalLayout_4.addWidget(self.buttonCancel)
+
+        self.dataAgeLabel = QLabel(Widget)
+        self.dataAgeLabel.setObjectName(u"dataAgeLabel")
+        self.dataAgeLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        self.verticalLayout_4.addWidget(self.dataAgeLabel)
+
+        self.verticalSpacer = QSpacerItem(20, 40, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding)
+
+        self.verticalLayout_4.addItem(self.verticalSpacer)
+
+
+        self.horizontalLayout_5.addLayout(self.verticalLayout_4)
+
+        self.bondsTableView = QTableView(Widget)
+        self.bondsTableView.setObjectName(u"bondsTableView")
+        self.bondsTableView.setAlternatingRowColors(True)
+        self.bondsTableView.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+
+        self.horizontalLayout_5.addWidget(self.bondsTableView)
+
+        self.horizontalLayout_5.setStretch(1, 1)
 
         self.retranslateUi(Widget)
 
@@ -118,9 +199,32 @@ class Ui_Widget(object):
     def retranslateUi(self, Widget):
         Widget.setWindowTitle(QCoreApplication.translate("Widget", u"MOEX Bond recommendations by n1tr0xs", None))
         self.label.setText(QCoreApplication.translate("Widget", u"\u041c\u0438\u043d\u0438\u043c\u0430\u043b\u044c\u043d\u0430\u044f \u0434\u043e\u0445\u043e\u0434\u043d\u043e\u0441\u0442\u044c", None))
+        self.label_4.setText(QCoreApplication.translate("Widget", u"\u041a\u043e\u043b\u0438\u0447\u0435\u0441\u0442\u0432\u043e \u043e\u0431\u043b\u0438\u0433\u0430\u0446\u0438\u0439", None))
+        self.topBondsSpinBox.setSpecialValueText(QCoreApplication.translate("Widget", u"\u0412\u0441\u0435", None))
+        self.label_5.setText(QCoreApplication.translate("Widget", u"\u041c\u0438\u043d\u0438\u043c\u0430\u043b\u044c\u043d\u044b\u0439 \u0440\u0435\u0439\u0442\u0438\u043d\u0433", None))
+        self.minCreditScoreComboBox.setItemText(0, QCoreApplication.translate("Widget", u"\u041b\u044e\u0431\u043e\u0439", None))
+        self.minCreditScoreComboBox.setItemText(1, QCoreApplication.translate("Widget", u"AAA", None))
+        self.minCreditScoreComboBox.setItemText(2, QCoreApplication.translate("Widget", u"AA+", None))
+        self.minCreditScoreComboBox.setItemText(3, QCoreApplication.translate("Widget", u"AA", None))
+        self.minCreditScoreComboBox.setItemText(4, QCoreApplication.translate("Widget", u"AA-", None))
+        self.minCreditScoreComboBox.setItemText(5, QCoreApplication.translate("Widget", u"A+", None))
+        self.minCreditScoreComboBox.setItemText(6, QCoreApplication.translate("Widget", u"A", None))
+        self.minCreditScoreComboBox.setItemText(7, QCoreApplication.translate("Widget", u"A-", None))
+        self.minCreditScoreComboBox.setItemText(8, QCoreApplication.translate("Widget", u"BBB+", None))
+        self.minCreditScoreComboBox.setItemText(9, QCoreApplication.translate("Widget", u"BBB", None))
+        self.minCreditScoreComboBox.setItemText(10, QCoreApplication.translate("Widget", u"BBB-", None))
+        self.minCreditScoreComboBox.setItemText(11, QCoreApplication.translate("Widget", u"BB+", None))
+        self.minCreditScoreComboBox.setItemText(12, QCoreApplication.translate("Widget", u"BB", None))
+        self.minCreditScoreComboBox.setItemText(13, QCoreApplication.translate("Widget", u"BB-", None))
+        self.minCreditScoreComboBox.setItemText(14, QCoreApplication.translate("Widget", u"B+", None))
+        self.minCreditScoreComboBox.setItemText(15, QCoreApplication.translate("Widget", u"B", None))
+        self.minCreditScoreComboBox.setItemText(16, QCoreApplication.translate("Widget", u"B-", None))
         self.label_1.setText(QCoreApplication.translate("Widget", u"\u0414\u043d\u0435\u0439 \u0434\u043e \u043f\u043e\u0433\u0430\u0448\u0435\u043d\u0438\u044f", None))
         self.label_2.setText(QCoreApplication.translate("Widget", u"\u041c\u0438\u043d\u0438\u043c\u0443\u043c", None))
         self.label_3.setText(QCoreApplication.translate("Widget", u"\u041c\u0430\u043a\u0441\u0438\u043c\u0443\u043c", None))
         self.buttonStart.setText(QCoreApplication.translate("Widget", u"\u0421\u0442\u0430\u0440\u0442", None))
+        self.buttonRefresh.setText(QCoreApplication.translate("Widget", u"\u041e\u0431\u043d\u043e\u0432\u0438\u0442\u044c \u0434\u0430\u043d\u043d\u044b\u0435", None))
+        self.buttonCancel.setText(QCoreApplication.translate("Widget", u"\u041e\u0441\u0442\u0430\u043d\u043e\u0432\u0438\u0442\u044c", None))
+        self.dataAgeLabel.setText(QCoreApplication.translate("Widget", u"\u0414\u0430\u043d\u043d\u044b\u0435 \u043d\u0435 \u0437\u0430\u0433\u0440\u0443\u0436\u0435\u043d\u044b", None))
     # retranslateUi
 
@@ -1,58 +1,537 @@
 import logging
 import requests
-import copy
+import re
+import time
+import heapq
+import threading
+import itertools
+import contextlib
+import collections
+from typing import Callable, Iterable, Iterator
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
 from bs4 import BeautifulSoup
+from lxml import etree
 from schemas import Bond, SearchCriteria
+from cache import CreditScoreCache
+from ratings import RatingProvider
+from network import Cancelled, TokenBucket, create_session
+from metrics import RunMetrics
+from logs import StageSummary
 
 logger = logging.getLogger("Utils")
 
+SMARTLAB_URL = "https://smart-lab.ru/q/bonds/{}"
+SMARTLAB_MAX_WORKERS = 4
+SMARTLAB_PARSE_WORKERS = 0  # processes parsing pages, 0 to parse in downloading threads
+SMARTLAB_PARSE_QUEUE = 2  # pages waiting for parsing per parsing process
+SMARTLAB_RATE = 2  # requests per second
+SMARTLAB_BURST = 4
+SMARTLAB_TIMEOUT = 15
+SMARTLAB_CHUNK_SIZE = 16 * 1024
+SMARTLAB_SCORE_LABEL = "Кредитный рейтинг"
+
+# From the best to the worst
+CREDIT_SCORE_SCALE = [
+    "AAA", "AA+", "AA", "AA-", "A+", "A", "A-",
+    "BBB+", "BBB", "BBB-", "BB+", "BB", "BB-", "B+", "B", "B-",
+    "CCC", "CC", "C", "RD", "SD", "D",
+]  # fmt: skip
+# Score is a separate word, optionally prefixed by national scale `ru`
+CREDIT_SCORE_PATTERN = re.compile(
+    r"(?<![A-Z])(?:RU)?(AAA|AA|A|BBB|BB|B|CCC|CC|C|RD|SD|D)([+-]?)(?![A-Z])"
+)
+
+
+class ParseQueue:
+    def __init__(self, workers: int, max_pages: int | None = None):
+        """
+        Inits ParseQueue - bounded queue of smartLab pages parsed by pool of `workers` processes.
+        `max_pages` - maximum amount of pages queued or being parsed,
+        `SMARTLAB_PARSE_QUEUE` per process by default.
+        """
+        self.executor = ProcessPoolExecutor(workers)
+        self._slots = threading.BoundedSemaphore(
+            max_pages or workers * SMARTLAB_PARSE_QUEUE
+        )
+
+    def submit(self, content: bytes, encoding: str = "utf-8") -> Future:
+        """
+        Queues page for parsing and returns future of its credit score, see `_parse_credit_score`.
+        Blocks only while queue is full, so downloading threads don't wait for their pages.
+        """
+        self._slots.acquire()
+        future = self.executor.submit(_parse_credit_score, content, encoding)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def shutdown(self) -> None:
+        self.executor.shutdown()
+
+
+class SmartLabClient:
+    def __init__(
+        self,
+        max_workers: int = SMARTLAB_MAX_WORKERS,
+        parse_workers: int = SMARTLAB_PARSE_WORKERS,
+    ):
+        """
+        Inits SmartLabClient - session, rate limiter and pools shared by all smartLab requests
+        of one run, so rate limit and connections hold across batches of requests.
+        `max_workers` - threads requesting pages concurrently.
+        `parse_workers` - processes parsing pages, 0 to parse in requesting threads.
+        """
+        self.max_workers = max_workers
+        self.limiter = TokenBucket(SMARTLAB_RATE, SMARTLAB_BURST)
+        self.session = create_session(pool_size=max_workers)
+        self.executor = ThreadPoolExecutor(max_workers)
+        self.parse_queue = ParseQueue(parse_workers) if parse_workers else None
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        if self.parse_queue is not None:
+            self.parse_queue.shutdown()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 
 def filter_bonds(bonds: list[Bond], criteria: SearchCriteria) -> list[Bond]:
     """
     Filters given bonds by criteria.
+    Counts of rejected bonds by the first failed criterion are logged as one summary,
+    per bond results are logged only at debug level.
     """
+    summary = StageSummary(logger, "Проверка критериев")
+    debug = logger.isEnabledFor(logging.DEBUG)
     filtered_bonds = []
     for bond in bonds:
-        condition = (
+        if not (
             criteria.min_days_to_maturity
             <= bond.days_to_maturity
             <= criteria.max_days_to_maturity
-            and criteria.min_bond_yield
-            <= bond.approximate_yield
-            <= criteria.max_bond_yield
-            and (criteria.face_units is None or bond.face_unit in criteria.face_units)
-        )
-        if condition:
-            logger.info(f"Облигация {bond.ISIN} прошла проверку критериев.")
-            filtered_bonds.append(bond)
+        ):
+            reason = "не подходит срок до погашения"
+        elif not (
+            criteria.min_bond_yield <= bond.approximate_yield <= criteria.max_bond_yield
+        ):
+            reason = "не подходит доходность"
+        elif criteria.face_units is not None and bond.face_unit not in criteria.face_units:
+            reason = "не подходит валюта номинала"
         else:
-            logger.info(f"Облигация {bond.ISIN} не прошла проверку критериев.")
+            reason = "прошли"
+            filtered_bonds.append(bond)
+        summary.add(reason)
+        if debug:
+            logger.debug(f"Облигация {bond.ISIN}: {reason}.")
+    summary.log()
     return filtered_bonds
 
 
-def with_credit_scores(bonds: list[Bond]) -> list[Bond]:
+def select_top_bonds(
+    bonds: Iterable[Bond],
+    criteria: SearchCriteria,
+    cache: CreditScoreCache | None = None,
+    max_workers: int = SMARTLAB_MAX_WORKERS,
+    metrics: RunMetrics | None = None,
+    providers: list[RatingProvider] | None = None,
+    parse_workers: int = SMARTLAB_PARSE_WORKERS,
+    client: SmartLabClient | None = None,
+) -> list[Bond]:
+    """
+    Returns up to `criteria.top_n` bonds with the highest yield and credit score
+    not worse than `criteria.min_credit_score`, sorted by yield descending.
+    Credit scores are requested only for candidates: bonds are taken from heap
+    in batches until enough bonds satisfy credit score criteria.
+    Batches are not smaller than amount of workers, all of them share one `SmartLabClient`,
+    given one or new one, so rate limit holds for the whole selection.
+    Bonds which already have credit score are not requested again,
+    so bonds shared by several selections are enriched once.
+    Sources of credit scores of all batches are logged as one summary.
+    """
+    heap = [(-bond.approximate_yield, i, bond) for i, bond in enumerate(bonds)]
+    heapq.heapify(heap)
+    limit = criteria.top_n or len(heap)
+    min_rank = credit_score_rank(criteria.min_credit_score)
+
+    selected = []
+    summary = StageSummary(logger, "Кредитные рейтинги")
+    with (
+        contextlib.nullcontext(client)
+        if client is not None
+        else SmartLabClient(max_workers, parse_workers)
+    ) as client:
+        while heap and len(selected) < limit:
+            batch_size = min(len(heap), max(limit - len(selected), client.max_workers))
+            batch = [heapq.heappop(heap)[2] for _ in range(batch_size)]
+            unscored = [bond for bond in batch if bond.credit_score is None]
+            if unscored:
+                logger.info(f"Получение кредитных рейтингов для {len(unscored)} облигаций.")
+                with_credit_scores(
+                    unscored,
+                    cache,
+                    metrics=metrics,
+                    providers=providers,
+                    client=client,
+                    summary=summary,
+                )
+            for bond in batch:
+                rank = credit_score_rank(bond.credit_score)
+                if min_rank is None or (rank is not None and rank <= min_rank):
+                    selected.append(bond)
+    if summary.counts:
+        summary.log()
+    return selected[:limit]
+
+
+def credit_score_rank(score: str | None) -> int | None:
     """
-    Adds credit scores to all bonds from list.
+    Returns position of credit score in `CREDIT_SCORE_SCALE`, the lower - the better.
+    National scale prefixes and suffixes like `ru`, `(RU)` or `|ru|` are ignored.
+    If score is unknown or text has no score, like `Not rated` - returns None.
     """
-    new_bonds = copy.deepcopy(bonds)
-    for bond in new_bonds:
-        bond.credit_score = _get_credit_score_SMARTLAB(bond.ISIN)
-    return new_bonds
+    if not score:
+        return None
+    match = CREDIT_SCORE_PATTERN.search(score.upper())
+    if match is None:
+        return None
+    try:
+        return CREDIT_SCORE_SCALE.index(match.group(1) + match.group(2))
+    except ValueError:
+        return CREDIT_SCORE_SCALE.index(match.group(1))
+
+
+def with_credit_scores(
+    bonds: Iterable[Bond],
+    cache: CreditScoreCache | None = None,
+    max_workers: int = SMARTLAB_MAX_WORKERS,
+    metrics: RunMetrics | None = None,
+    providers: list[RatingProvider] | None = None,
+    parse_workers: int = SMARTLAB_PARSE_WORKERS,
+    client: SmartLabClient | None = None,
+    summary: StageSummary | None = None,
+) -> list[Bond]:
+    """
+    Adds credit scores to all bonds, keeping order of bonds.
+    Bonds are modified in place.
+    If summary given - sources of scores are counted to it, see `iter_credit_scores`.
+    """
+    return list(
+        iter_credit_scores(
+            bonds,
+            cache,
+            max_workers,
+            metrics=metrics,
+            providers=providers,
+            parse_workers=parse_workers,
+            client=client,
+            summary=summary,
+        )
+    )
+
+
+def iter_credit_scores(
+    bonds: Iterable[Bond],
+    cache: CreditScoreCache | None = None,
+    max_workers: int = SMARTLAB_MAX_WORKERS,
+    buffer_size: int | None = None,
+    metrics: RunMetrics | None = None,
+    providers: list[RatingProvider] | None = None,
+    parse_workers: int = SMARTLAB_PARSE_WORKERS,
+    stop: threading.Event | None = None,
+    client: SmartLabClient | None = None,
+    summary: StageSummary | None = None,
+) -> Iterator[Bond]:
+    """
+    Yields bonds with credit scores added, keeping order of bonds.
+    Bonds are modified in place.
+    Scores are requested concurrently by `max_workers` threads sharing one session,
+    requests rate is limited by `SMARTLAB_RATE`.
+    At most `buffer_size` bonds are taken from `bonds` ahead of yielded one.
+    If cache given - scores are taken from it and smartLab is requested only on cache miss.
+    If metrics given - all requests are recorded to it.
+    If providers given - scores are looked up in them in order before smartLab bond pages.
+    If `parse_workers` given - downloaded pages are handed to `ParseQueue` of `parse_workers` processes,
+    so parsing uses all cores while downloading threads go on to next pages.
+    Memory is capped by `buffer_size` and size of parse queue.
+    If stop is set - requests which aren't sent yet are cancelled and `Cancelled` is raised,
+    rate limit waits are interrupted too.
+    If client given - its session, rate limiter and pools are used instead of
+    `max_workers` and `parse_workers`, so several calls share one rate limit.
+    Sources of scores are counted to summary, which is logged when all bonds are yielded.
+    If summary given - it is left to the caller to log, so several calls are logged as one.
+    """
+    log_summary = summary is None
+    summary = summary or StageSummary(logger, "Кредитные рейтинги")
+    with (
+        contextlib.nullcontext(client)
+        if client is not None
+        else SmartLabClient(max_workers, parse_workers)
+    ) as client:
+        buffer_size = buffer_size or client.max_workers * 4
+        pending = collections.deque()
+        try:
+            for bond in bonds:
+                _check_stop(stop)
+                pending.append(
+                    (
+                        bond,
+                        client.executor.submit(
+                            _get_credit_score,
+                            bond.ISIN,
+                            cache,
+                            client.session,
+                            client.limiter,
+                            metrics,
+                            providers,
+                            client.parse_queue,
+                            stop,
+                        ),
+                    )
+                )
+                if len(pending) >= buffer_size:
+                    yield _with_credit_score(*pending.popleft(), summary)
+            while pending:
+                _check_stop(stop)
+                yield _with_credit_score(*pending.popleft(), summary)
+            if log_summary:
+                summary.log()
+        finally:
+            # Executor waits for queued requests on exit, so they are dropped if not consumed
+            for _, future in pending:
+                future.cancel()
 
 
-def _get_credit_score_SMARTLAB(ISIN: str) -> str:
+def _check_stop(stop: threading.Event | None) -> None:
+    if stop is not None and stop.is_set():
+        raise Cancelled()
+
+
+def _with_credit_score(bond: Bond, future: Future, summary: StageSummary) -> Bond:
+    result = future.result()
+    # Score of page handed to parse queue is not known when downloading thread finishes
+    if isinstance(result, Future):
+        result = result.result()
+    bond.credit_score, source = result
+    summary.add(source, sample=bond.ISIN if source == "ошибка запроса" else None)
+    return bond
+
+
+def _get_credit_score(
+    ISIN: str,
+    cache: CreditScoreCache | None = None,
+    session: requests.Session | None = None,
+    limiter: TokenBucket | None = None,
+    metrics: RunMetrics | None = None,
+    providers: list[RatingProvider] | None = None,
+    parse_queue: ParseQueue | None = None,
+    stop: threading.Event | None = None,
+) -> tuple[str, str] | Future:
+    """
+    Returns credit score and its source.
+    Score is taken from cache if possible, otherwise from the first provider
+    knowing it or parsed from smartLab bond page, and stored to cache.
+    If page is handed to parse queue - returns future of credit score and its source.
+    If smartLab can't be reached - returns unknown score without caching it.
+    If stop is set before smartLab is requested - raises `Cancelled`.
+    """
+    if cache is not None:
+        score = cache.get(ISIN)
+        if score is not None:
+            logger.debug(f"Кредитный рейтинг эмитента облигации {ISIN} взят из кэша.")
+            return score, "из кэша"
+
+    def store(score: str, source: str) -> tuple[str, str]:
+        if cache is not None:
+            cache.set(ISIN, score)
+        return score, source
+
+    def store_SMARTLAB(score: str) -> tuple[str, str]:
+        return store(score, "со smartLab" if score != "Неизвестно" else "не известен")
+
+    score = _get_provided_credit_score(ISIN, providers)
+    if score is not None:
+        return store(score, "от провайдера")
+
+    _check_stop(stop)
+    wait_time = limiter.acquire(stop) if limiter is not None else 0
+    try:
+        score = _get_credit_score_SMARTLAB(ISIN, session, metrics, wait_time, parse_queue)
+    except requests.RequestException as e:
+        logger.debug(
+            f"Не удалось получить кредитный рейтинг эмитента облигации {ISIN}: {e}."
+        )
+        return "Неизвестно", "ошибка запроса"
+    if isinstance(score, Future):
+        return _then(score, store_SMARTLAB)
+    return store_SMARTLAB(score)
+
+
+def _get_provided_credit_score(
+    ISIN: str, providers: list[RatingProvider] | None = None
+) -> str | None:
+    """
+    Returns credit score from the first provider knowing it, None if no provider knows it.
+    """
+    for provider in providers or []:
+        score = provider.get_ratings([ISIN]).get(ISIN)
+        if score is not None:
+            logger.debug(
+                f"Кредитный рейтинг эмитента облигации {ISIN} взят из {type(provider).__name__}."
+            )
+            return score
+    return None
+
+
+def _get_credit_score_SMARTLAB(
+    ISIN: str,
+    session: requests.Session | None = None,
+    metrics: RunMetrics | None = None,
+    wait_time: float = 0,
+    parse_queue: ParseQueue | None = None,
+) -> str | Future:
     """
     Parses credit score using smartLab.
+    Page is parsed while downloading and parsing stops as soon as credit score is found.
+    Rest of the page is still read, so the connection is returned to the pool of session
+    instead of being closed.
+    If fast parsing finds nothing - the whole page is parsed with BeautifulSoup.
+    If parse_queue given - the whole page is downloaded and handed to it,
+    future of credit score is returned without waiting for parsing.
+    Error responses raise `requests.HTTPError`, so they aren't cached as unknown scores.
     """
-    logger.info(f"Получение кредитного рейтинга эмитента облигации {ISIN}.")
-    BASE_URL = "https://smart-lab.ru/q/bonds/{}"
-    response = requests.get(BASE_URL.format(ISIN))
-    soup = BeautifulSoup(response.text, "lxml")
-    div = soup.find("div", text="Кредитный рейтинг")
+    logger.debug(f"Получение кредитного рейтинга эмитента облигации {ISIN}.")
+    url = SMARTLAB_URL.format(ISIN)
+    start = time.perf_counter()
+    response = None
     try:
-        score = div.find_next().text.strip()
-        logger.info(f"Кредитный рейтинг эмитента облигации {ISIN} - {score}.")
-    except AttributeError:
-        score = "Неизвестно"
-        logger.info(f"Кредитный рейтинг эмитента облигации {ISIN} не известен.")
+        with (session or requests).get(
+            url, timeout=SMARTLAB_TIMEOUT, stream=parse_queue is None
+        ) as response:
+            response.raise_for_status()
+            encoding = response.encoding or "utf-8"
+            if parse_queue is None:
+                chunks = []
+                stream = response.iter_content(SMARTLAB_CHUNK_SIZE)
+                score = _extract_credit_score(_remember(stream, chunks), encoding)
+                for _ in stream:
+                    pass
+                if score is None:
+                    score = _extract_credit_score_BS(
+                        b"".join(chunks).decode(encoding, errors="replace")
+                    )
+            else:
+                content = response.content
+    finally:
+        if metrics is not None:
+            metrics.record_request(url, start, response, wait_time)
+
+    if parse_queue is not None:
+        return _then(
+            parse_queue.submit(content, encoding),
+            lambda score: _known_credit_score(ISIN, score),
+        )
+    return _known_credit_score(ISIN, score)
+
+
+def _known_credit_score(ISIN: str, score: str | None) -> str:
+    """
+    Returns parsed credit score, or unknown score if nothing is parsed.
+    """
+    if score is not None:
+        logger.debug(f"Кредитный рейтинг эмитента облигации {ISIN} - {score}.")
+        return score
+    logger.debug(f"Кредитный рейтинг эмитента облигации {ISIN} не известен.")
+    return "Неизвестно"
+
+
+def _then(future: Future, function: Callable) -> Future:
+    """
+    Returns future of function applied to result of future, errors are passed on.
+    Function runs in thread completing future.
+    """
+    chained = Future()
+
+    def resolve(done: Future) -> None:
+        try:
+            chained.set_result(function(done.result()))
+        except BaseException as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(resolve)
+    return chained
+
+
+def _parse_credit_score(content: bytes, encoding: str = "utf-8") -> str | None:
+    """
+    Returns credit score from the whole smartLab bond page.
+    Runs in parsing processes, so it takes and returns only picklable values.
+    """
+    score = _extract_credit_score([content], encoding)
+    if score is None:
+        score = _extract_credit_score_BS(content.decode(encoding, errors="replace"))
     return score
+
+
+def _extract_credit_score(chunks: Iterable[bytes], encoding: str = "utf-8") -> str | None:
+    """
+    Returns credit score from chunks of smartLab bond page.
+    Chunks are parsed incrementally and parsing stops as soon as credit score is found.
+    Returns None if there is no credit score on page or page can't be parsed,
+    so callers fall back to BeautifulSoup.
+    """
+    parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+    label_found = False
+    score_element = None
+    for chunk in itertools.chain(chunks, [None]):
+        try:
+            if chunk is None:
+                parser.close()
+            else:
+                parser.feed(chunk)
+        except (etree.ParserError, etree.XMLSyntaxError):
+            return None
+        for event, element in parser.read_events():
+            if score_element is not None:
+                if event == "end" and element is score_element:
+                    return "".join(element.itertext()).strip()
+            elif label_found:
+                if event == "start":
+                    score_element = element
+            elif (
+                event == "end"
+                and element.tag == "div"
+                and element.text == SMARTLAB_SCORE_LABEL
+                and len(element) == 0
+            ):
+                label_found = True
+    return None
+
+
+def _extract_credit_score_BS(text: str) -> str | None:
+    """
+    Returns credit score from smartLab bond page using BeautifulSoup.
+    Returns None if there is no credit score on page.
+    """
+    soup = BeautifulSoup(text, "lxml")
+    div = soup.find("div", text=SMARTLAB_SCORE_LABEL)
+    try:
+        return div.find_next().text.strip()
+    except AttributeError:
+        return None
+
+
+def _remember(chunks: Iterable[bytes], store: list[bytes]) -> Iterator[bytes]:
+    """
+    Yields chunks, appending each of them to store.
+    """
+    for chunk in chunks:
+        store.append(chunk)
+        yield chunk
@@ -0,0 +1,106 @@
+import logging
+import datetime
+import threading
+from typing import Callable
+
+import utils
+from moex import MOEX_API
+from schemas import Bond, SearchCriteria
+from table import BondTable
+from cache import CreditScoreCache
+from ratings import RatingProvider
+from snapshot import SecuritiesDelta, SnapshotStore
+
+logger = logging.getLogger("Watch")
+
+
+class Watcher:
+    def __init__(
+        self,
+        criteria: SearchCriteria,
+        interval: float = 60,
+        on_update: Callable[[list[Bond]], None] | None = None,
+        store: SnapshotStore | None = None,
+        cache: CreditScoreCache | None = None,
+        providers: list[RatingProvider] | None = None,
+        moex_api: MOEX_API | None = None,
+    ):
+        """
+        Inits Watcher - resident service refreshing bonds and their ranking on schedule.
+        Session, snapshots of boardgroups, cached yields and credit scores are kept between refreshes,
+        so a refresh downloads only changed boardgroups and parses only changed securities.
+        `interval` - seconds between refreshes, raised to fit ISS requests rate limit.
+        `on_update` - called with new top bonds whenever ranking changes.
+        """
+        self.criteria = criteria
+        self.moex_api = moex_api or MOEX_API()
+        self.interval = max(interval, self.min_interval(self.moex_api))
+        if self.interval > interval:
+            logger.warning(
+                f"Интервал обновления увеличен до {self.interval:.1f} секунд из-за ограничения частоты запросов."
+            )
+        self.on_update = on_update or (lambda bonds: None)
+        self.store = store or SnapshotStore()
+        self.cache = cache
+        self.providers = providers
+        self.table: BondTable | None = None
+        self.bonds: list[Bond] = []
+
+        self._ranking: list[str] | None = None
+        self._as_of: datetime.date | None = None
+
+    @staticmethod
+    def min_interval(moex_api: MOEX_API) -> float:
+        """
+        Returns minimal seconds between refreshes which keeps ISS requests under rate limit.
+        """
+        return len(moex_api.BOARDGROUPS) * 60 / moex_api.API_REQUESTS_PER_MINUTE
+
+    def run(self, stop: threading.Event | None = None) -> None:
+        """
+        Refreshes bonds every `self.interval` seconds until stop is set.
+        """
+        stop = stop or threading.Event()
+        logger.info(f"Наблюдение запущено, интервал {self.interval:.1f} секунд.")
+        while not stop.is_set():
+            self.refresh()
+            stop.wait(self.interval)
+        logger.info(f"Наблюдение остановлено.")
+
+    def refresh(self) -> list[Bond] | None:
+        """
+        Refreshes bonds once.
+        Returns new top bonds and calls `self.on_update` if ranking changed, otherwise returns None.
+        """
+        tables = []
+        delta = SecuritiesDelta()
+        for table, boardgroup_delta in self.moex_api.iter_bond_tables(self.store):
+            tables.append(table)
+            delta.extend(boardgroup_delta)
+
+        today = datetime.date.today()
+        if delta.is_empty and self._as_of == today:
+            logger.info(f"Изменений нет.")
+            return None
+        logger.info(
+            f"Изменения: добавлено {len(delta.added)}, удалено {len(delta.removed)}, изменено {len(delta.changed)} бумаг."
+        )
+
+        self.table = BondTable.concat(tables).drop_duplicates()
+        self._as_of = today
+        bonds = utils.select_top_bonds(
+            self.table.filter(self.criteria).iter_bonds(),
+            self.criteria,
+            self.cache,
+            providers=self.providers,
+        )
+
+        ranking = [bond.ISIN for bond in bonds]
+        if ranking == self._ranking:
+            logger.info(f"Рейтинг облигаций не изменился.")
+            return None
+        self._ranking = ranking
+        self.bonds = bonds
+        logger.info(f"Рейтинг облигаций изменился, отобрано {len(bonds)} облигаций.")
+        self.on_update(bonds)
+        return bonds
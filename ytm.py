@@ -0,0 +1,178 @@
+import datetime
+import logging
+import numpy as np
+
+from schemas import Bond
+
+logger = logging.getLogger("YTM")
+
+MAX_NEWTON_ITERATIONS = 20
+MAX_BISECTION_ITERATIONS = 100
+TOLERANCE = 1e-9  # in yield units
+MIN_YIELD = -0.99
+MAX_YIELD = 100.0
+DAYS_IN_YEAR = 365
+
+
+def with_yields_to_maturity(bonds: list[Bond], schedules: dict[str, dict]) -> list[Bond]:
+    """
+    Sets `yield_to_maturity` of given bonds and returns them.
+    Bonds without schedule, with empty schedule or with unsolvable yield keep None.
+    `schedules` - see `MOEX_API.get_schedules`.
+    """
+    bonds_with_schedule = [
+        bond for bond in bonds if any(schedules.get(bond.ISIN, {}).values())
+    ]
+    if not bonds_with_schedule:
+        return bonds
+
+    amounts, times = cash_flows(bonds_with_schedule, schedules)
+    prices = np.array([bond.broker_price for bond in bonds_with_schedule])
+    guesses = np.array([bond.approximate_yield / 100 for bond in bonds_with_schedule])
+    yields = solve_yields(prices, amounts, times, guesses)
+
+    for bond, value in zip(bonds_with_schedule, yields):
+        bond.yield_to_maturity = None if np.isnan(value) else round(value * 100, 2)
+    logger.info(
+        f"Рассчитана доходность к погашению для {np.count_nonzero(~np.isnan(yields))}/{len(bonds)} облигаций."
+    )
+    return bonds
+
+
+def cash_flows(
+    bonds: list[Bond], schedules: dict[str, dict]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns padded arrays of future cash flows amounts and their times in years, one row per bond.
+    Unknown future coupons are assumed equal to the current coupon.
+    If schedule has no amortizations - face value is repaid at maturity date.
+    Padding cash flows have zero amount and zero time.
+    """
+    rows = [_bond_cash_flows(bond, schedules[bond.ISIN]) for bond in bonds]
+    width = max((len(row) for row in rows), default=0)
+    amounts = np.zeros((len(rows), width))
+    times = np.zeros((len(rows), width))
+    for i, row in enumerate(rows):
+        if row:
+            days, values = zip(*row)
+            times[i, : len(row)] = np.array(days) / DAYS_IN_YEAR
+            amounts[i, : len(row)] = values
+    return amounts, times
+
+
+def solve_yields(
+    prices: np.ndarray,
+    amounts: np.ndarray,
+    times: np.ndarray,
+    guesses: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Returns annual effective yields solving `sum(amounts * (1 + y) ** -times) == prices` for every row.
+    All rows are solved at once by Newton iterations, rows where Newton diverged
+    are solved by bisection over [MIN_YIELD, MAX_YIELD].
+    Rows without solution are NaN.
+    """
+    yields = np.full(len(prices), np.nan)
+    solvable = np.isfinite(prices) & (prices > 0) & (amounts > 0).any(axis=1)
+    if guesses is None:
+        guesses = np.full(len(prices), 0.1)
+    guesses = np.clip(np.nan_to_num(guesses, nan=0.1), MIN_YIELD / 2, MAX_YIELD / 2)
+
+    rows = np.flatnonzero(solvable)
+    newton = _newton(prices[rows], amounts[rows], times[rows], guesses[rows])
+    yields[rows] = newton
+
+    rows = rows[np.isnan(newton)]
+    if len(rows):
+        logger.debug(f"Метод Ньютона не сошелся для {len(rows)} облигаций.")
+        yields[rows] = _bisection(prices[rows], amounts[rows], times[rows])
+    return yields
+
+
+def _present_value(
+    yields: np.ndarray, amounts: np.ndarray, times: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns present values of cash flows rows and their derivatives by yield.
+    """
+    discounts = (1 + yields[:, None]) ** -times
+    values = amounts * discounts
+    derivatives = -(values * times).sum(axis=1) / (1 + yields)
+    return values.sum(axis=1), derivatives
+
+
+def _newton(
+    prices: np.ndarray, amounts: np.ndarray, times: np.ndarray, guesses: np.ndarray
+) -> np.ndarray:
+    """
+    Returns yields found by Newton iterations, NaN where iterations didn't converge.
+    Converged rows are excluded from next iterations.
+    """
+    yields = np.full(len(prices), np.nan)
+    current = guesses.copy()
+    active = np.arange(len(prices))
+    with np.errstate(all="ignore"):
+        for _ in range(MAX_NEWTON_ITERATIONS):
+            if not len(active):
+                break
+            values, derivatives = _present_value(current, amounts[active], times[active])
+            steps = (values - prices[active]) / derivatives
+            current = current - steps
+
+            valid = np.isfinite(current) & (current > MIN_YIELD) & (current < MAX_YIELD)
+            converged = valid & (np.abs(steps) < TOLERANCE)
+            yields[active[converged]] = current[converged]
+
+            keep = valid & ~converged
+            active = active[keep]
+            current = current[keep]
+    return yields
+
+
+def _bisection(prices: np.ndarray, amounts: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """
+    Returns yields found by bisection, NaN where root is not bracketed by [MIN_YIELD, MAX_YIELD].
+    Present value of positive cash flows decreases with yield.
+    """
+    low = np.full(len(prices), MIN_YIELD)
+    high = np.full(len(prices), MAX_YIELD)
+    with np.errstate(all="ignore"):
+        low_values, _ = _present_value(low, amounts, times)
+        high_values, _ = _present_value(high, amounts, times)
+        bracketed = (low_values >= prices) & (high_values <= prices)
+        for _ in range(MAX_BISECTION_ITERATIONS):
+            middle = (low + high) / 2
+            values, _ = _present_value(middle, amounts, times)
+            above = values > prices
+            low = np.where(above, middle, low)
+            high = np.where(above, high, middle)
+            if np.all(high - low < TOLERANCE):
+                break
+    return np.where(bracketed, (low + high) / 2, np.nan)
+
+
+def _bond_cash_flows(bond: Bond, schedule: dict) -> list[tuple[int, float]]:
+    """
+    Returns future cash flows of bond as (days from `bond.as_of`, amount) pairs.
+    """
+    flows = []
+    for date, value in schedule["coupons"]:
+        days = _days_from(bond.as_of, date)
+        if days is not None and days > 0:
+            flows.append((days, bond.coupon_value if value is None else value))
+
+    for date, value in schedule["amortizations"]:
+        days = _days_from(bond.as_of, date)
+        if days is not None and days > 0 and value:
+            flows.append((days, value))
+
+    if not schedule["amortizations"] and bond.days_to_maturity > 0:
+        flows.append((bond.days_to_maturity, bond.face_value))
+    return flows
+
+
+def _days_from(as_of: datetime.date, date: str) -> int | None:
+    try:
+        return (datetime.date.fromisoformat(date) - as_of).days
+    except (TypeError, ValueError):
+        return None